@@ -161,4 +161,31 @@ MEDIA_URL = '/date/vmb/documents/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'uploads')
 EXPENDITURE_ROOT = os.path.join(MEDIA_ROOT, 'expenditures')
 TIMECARDS_ROOT = os.path.join(MEDIA_ROOT, 'timecards')
+# rendered charts, keyed by the data version of their projects
+CHART_CACHE_ROOT = os.path.join(MEDIA_ROOT, 'charts')
 #MEDIA_ROOT = os.path.abspath(os.path.join(os.sep, 'data', 'vmb', 'documents'))
+
+# for imports, number of rows written to the database in one statement
+IMPORT_BATCH_SIZE = 1000
+# for imports, number of rows read from a file at once, bounds the memory of an import
+IMPORT_CHUNK_SIZE = 20000
+# for imports, one transaction by "chunk" or by "file"
+IMPORT_TRANSACTION_SCOPE = "chunk"
+# imports run as background jobs, SQLite allows only a single writer anyway
+IMPORT_JOBS_ASYNC = True
+IMPORT_WORKERS = 1
+# number of processes parsing files in parallel when several files are imported at once,
+# 1 parses in the importing process, more is opt-in and hands the parsed chunks over through bounded queues
+IMPORT_PARSE_WORKERS = 1
+# files imported while uploading are kept in the upload folder as well
+IMPORT_KEEP_UPLOADS = False
+# seconds after which an unfinished import of a file counts as abandoned
+IMPORT_CLAIM_TIMEOUT = 6 * 60 * 60
+# seconds after which the lock of an import that did not finish counts as abandoned
+IMPORT_LOCK_TIMEOUT = 6 * 60 * 60
+# day of the month the fiscal months start on (1 to 28), e.g. 26 for fiscal months running from the 26th to the 25th
+FISCAL_MONTH_START_DAY = 1
+# the least recently used charts are removed once the chart cache grows beyond this size
+CHART_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# "server" serves the charts as images, "client" draws them in the browser from their series, ?charts= overrides it
+CHART_RENDERING = "server"
@@ -1,8 +1,9 @@
 from django.contrib import admin
-from.models import Project, ExpenditureItem, ExpenditureDocument
+from.models import Project, ExpenditureItem, ExpenditureDocument, ImportedFile
 
 # Register your models here.
 
 admin.site.register(Project)
 admin.site.register(ExpenditureItem)
-admin.site.register(ExpenditureDocument)
\ No newline at end of file
+admin.site.register(ExpenditureDocument)
+admin.site.register(ImportedFile)
\ No newline at end of file
@@ -0,0 +1,191 @@
+from django.db.models import Sum
+from functools import cached_property
+from logging import getLogger
+
+import numpy as np
+import pandas as pd
+
+from .models import Project, Project_Group, TimecardRollup, TASK_TYPES
+
+
+logger = getLogger(__name__)
+
+TASK_TYPE_NAMES = dict(TASK_TYPES)
+
+
+def _or_none(value):
+    '''floats of a frame for the templates, missing sums become None'''
+    return None if pd.isna(value) else round(float(value), 2)
+
+
+def rollup_line(task, milestone_name, hours, sold_hours) -> dict:
+    '''one line of the hours, sold hours and delta by milestone'''
+    if milestone_name is None:
+        return {"task": task, "name": task, "hours": hours, "sold_hours": None, "delta": float("NaN")}
+    return {
+        "task": task,
+        "name": TASK_TYPE_NAMES.get(milestone_name, milestone_name),
+        "hours": hours,
+        "sold_hours": sold_hours,
+        "delta": round(sold_hours - hours, 2) if hours is not None else sold_hours,
+    }
+
+
+def team_lines(frame: pd.DataFrame) -> list:
+    """
+    pivots a frame with the columns team, milestone, milestone_name and
+    hours into one line by team with the hours by milestone name, the
+    milestones are in the order of their ids, missing sums are None
+    """
+    if frame.empty:
+        return []
+    names = frame["milestone_name"].astype(object).map(lambda name: TASK_TYPE_NAMES.get(name, name))
+    frame = frame.assign(milestone_name=names)
+    milestone_names = frame.sort_values("milestone", kind="stable")["milestone_name"].drop_duplicates().tolist()
+    table = frame.pivot_table(
+        index="team", columns="milestone_name", values="hours", aggfunc="sum", observed=True
+    ).reindex(columns=milestone_names)
+
+    return [
+        {
+            "team": {"team": team},
+            "sums": [
+                {"milestone": name, "hours": {"sum": _or_none(hours)}}
+                for name, hours in zip(milestone_names, table.loc[team].tolist())
+            ],
+        }
+        for team in sorted(table.index)
+    ]
+
+
+class ProjectAnalytics:
+    """
+    the timecard hours of a project, fetched once from the weekly rollups
+    into a small frame. Every table, average and chart series of the
+    detail page is derived from this frame without further queries.
+    """
+
+    COLUMNS = ["milestone", "task", "milestone_name", "sold_hours", "team", "week", "month", "hours"]
+
+    def __init__(self, project: Project):
+        self.project = project
+        rows = project.timecardrollup_set.values_list(
+            "milestone", "milestone__task", "milestone__name", "milestone__sold_hours",
+            "team", "week", "month", "total_hours",
+        )
+        frame = pd.DataFrame.from_records(list(rows), columns=self.COLUMNS)
+        self.frame = frame.astype(
+            {
+                "task": "category",
+                "milestone_name": "category",
+                "team": "category",
+                "sold_hours": "float64",
+                "hours": "float64",
+            }
+        )
+
+    @cached_property
+    def by_month(self) -> pd.Series:
+        return self.frame.groupby("month")["hours"].sum().sort_index()
+
+    @cached_property
+    def by_week(self) -> pd.Series:
+        return self.frame.groupby("week")["hours"].sum().sort_index()
+
+    @cached_property
+    def hours_by_month(self) -> list:
+        return [{"month": month, "sum": round(hours, 2)} for month, hours in self.by_month.items()]
+
+    @cached_property
+    def hours_sum(self) -> dict:
+        return {"sum": round(float(self.frame["hours"].sum()), 2) if not self.frame.empty else None}
+
+    @cached_property
+    def avg_burned(self):
+        return float(self.by_month.mean()) if not self.by_month.empty else None
+
+    @cached_property
+    def team_lines(self) -> list:
+        return team_lines(self.frame)
+
+    @cached_property
+    def milestone_lines(self) -> list:
+        sums = self.frame.groupby(["task", "milestone"], observed=True).agg(
+            milestone_name=("milestone_name", "first"),
+            sold_hours=("sold_hours", "first"),
+            hours=("hours", "sum"),
+        )
+        return [
+            rollup_line(task, milestone_name, round(hours, 2), sold_hours)
+            for (task, _), milestone_name, sold_hours, hours in zip(
+                sums.index, sums["milestone_name"], sums["sold_hours"], sums["hours"]
+            )
+        ]
+
+    def burndown(self, timeframe: str):
+        """
+        returns the periods, the hours burned in each period and the hours
+        remaining after it, by week or by month
+        """
+        sums = self.by_month if timeframe == "month" else self.by_week
+        burned = float(self.project.sold_hours) - np.cumsum(sums.to_numpy())
+        return sums.index.tolist(), sums.tolist(), burned.tolist()
+
+
+class GroupAnalytics:
+    """
+    the timecard hours of all projects of a group, fetched with one query
+    grouped by project, month, milestone and team. Group totals, the
+    breakdown by project and the chart series are derived from it, so the
+    number of queries does not grow with the size of the group.
+    """
+
+    COLUMNS = ["project", "month", "milestone", "milestone_name", "team", "hours"]
+
+    def __init__(self, project_group: Project_Group):
+        self.project_group = project_group
+        rows = (
+            TimecardRollup.objects.filter(project__project_group=project_group)
+            .values_list("project", "month", "milestone", "milestone__name", "team")
+            .order_by()
+            .annotate(hours=Sum("total_hours"))
+        )
+        frame = pd.DataFrame.from_records(list(rows), columns=self.COLUMNS)
+        self.frame = frame.astype(
+            {"milestone_name": "category", "team": "category", "hours": "float64"}
+        )
+
+    @cached_property
+    def by_month(self) -> pd.Series:
+        return self.frame.groupby("month")["hours"].sum().sort_index()
+
+    @cached_property
+    def hours_by_month(self) -> list:
+        return [{"month": month, "sum": round(hours, 2)} for month, hours in self.by_month.items()]
+
+    @cached_property
+    def hours_sum(self) -> dict:
+        return {"sum": round(float(self.frame["hours"].sum()), 2) if not self.frame.empty else None}
+
+    @cached_property
+    def hours_by_project(self) -> dict:
+        '''oracle id -> hours of the project'''
+        return {
+            project: round(hours, 2) for project, hours in self.frame.groupby("project")["hours"].sum().items()
+        }
+
+    @cached_property
+    def team_lines(self) -> list:
+        return team_lines(self.frame)
+
+    @cached_property
+    def milestone_sum(self) -> dict:
+        '''milestone name -> hours, milestones with the same name summed up'''
+        frame = self.frame.sort_values("milestone", kind="stable")
+        names = frame["milestone_name"].astype(object).map(lambda name: TASK_TYPE_NAMES.get(name, name))
+        sums = frame.groupby(names, sort=False)["hours"].sum()
+        return {name: round(hours, 2) for name, hours in sums.items()}
+
+    def series(self):
+        '''the months and the hours of the group in each month'''
+        return self.by_month.index.tolist(), self.by_month.tolist()
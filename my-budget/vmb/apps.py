@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class VmbConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "vmb"
+
+    def ready(self):
+        from . import jobs
+
+        jobs.start()
@@ -0,0 +1,105 @@
+from django.conf import settings
+from logging import getLogger
+
+import hashlib
+import os
+import tempfile
+
+from .charts import FORMATS
+
+
+logger = getLogger(__name__)
+
+
+def group_data_version(projects) -> str:
+    '''one version for the charts of a group, changes with its members and their versions'''
+    members = ",".join(f"{project.oracle_id}:{project.data_version}" for project in projects)
+    return hashlib.sha1(members.encode()).hexdigest()[:12]
+
+
+def _path(kind: str, object_id, timeframe: str, version, format: str) -> str:
+    return os.path.join(settings.CHART_CACHE_ROOT, f"{kind}-{object_id}-{timeframe}-{version}.{format}")
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def cached_chart(kind: str, object_id, timeframe: str, version, format: str, render) -> bytes:
+    """
+    returns the rendered chart from the cache, render is only called on a
+    miss. Entries are files named after kind, object id, timeframe and
+    data version, older versions of the same chart are dropped on a miss.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"unknown chart format {format}")
+    path = _path(kind, object_id, timeframe, version, format)
+    try:
+        with open(path, "rb") as fp:
+            image = fp.read()
+        os.utime(path)
+        return image
+    except FileNotFoundError:
+        pass
+
+    image = render()
+    try:
+        _store(path, image)
+        prefix = f"{kind}-{object_id}-{timeframe}-"
+        for entry in os.scandir(settings.CHART_CACHE_ROOT):
+            if entry.name.startswith(prefix) and entry.name.endswith(f".{format}") and entry.path != path:
+                _remove(entry.path)
+        evict()
+    except OSError as e:
+        logger.warning(f"could not cache chart {path}: {e}")
+    return image
+
+
+def _store(path: str, image: bytes):
+    '''writes to a temporary file first, so readers never see half a chart'''
+    os.makedirs(settings.CHART_CACHE_ROOT, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=settings.CHART_CACHE_ROOT, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(image)
+        os.replace(temporary, path)
+    except BaseException:
+        _remove(temporary)
+        raise
+
+
+def evict(max_bytes: int = None):
+    """
+    removes the least recently used charts until the cache is no larger than
+    CHART_CACHE_MAX_BYTES, hits touch the files so their mtime is the last use
+    """
+    if max_bytes is None:
+        max_bytes = settings.CHART_CACHE_MAX_BYTES
+    entries = []
+    for entry in os.scandir(settings.CHART_CACHE_ROOT):
+        if entry.name.endswith(".tmp") or not entry.is_file():
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    size = sum(entry[1] for entry in entries)
+    for _, entry_size, path in sorted(entries):
+        if size <= max_bytes:
+            break
+        _remove(path)
+        size -= entry_size
+
+
+def clear():
+    '''removes all cached charts'''
+    if not os.path.isdir(settings.CHART_CACHE_ROOT):
+        return
+    for entry in os.scandir(settings.CHART_CACHE_ROOT):
+        if entry.is_file():
+            _remove(entry.path)
@@ -0,0 +1,73 @@
+"""
+charts rendered with the object oriented matplotlib api. Every call builds
+its own Figure on its own FigureCanvasAgg and pyplot is never imported, so
+there is no global figure state and threaded workers can render charts in
+parallel.
+"""
+from io import BytesIO
+from logging import getLogger
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import matplotlib.dates as mdates
+
+
+logger = getLogger(__name__)
+
+FIGSIZE = (7, 4)
+DPI = 96
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def _figure() -> Figure:
+    figure = Figure(figsize=FIGSIZE)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def _month_axis(axes):
+    '''one tick per month labeled like Jan 2025'''
+    axes.xaxis.set_major_locator(mdates.MonthLocator())
+    axes.xaxis.set_major_formatter(mdates.DateFormatter("%b %Y"))
+    axes.tick_params(axis="x", labelrotation=20)
+
+
+def burndown_chart(title: str, periods, sums, remaining, ideal_periods, ideal_remaining, timeframe: str = "week") -> Figure:
+    """
+    the remaining hours as steps against the ideal burndown, with the hours
+    burned in each period as bars on a second axis
+    """
+    figure = _figure()
+    ax1 = figure.add_subplot()
+    ax1.plot(ideal_periods, ideal_remaining, linestyle="dashed", color="green", label="Ideal")
+    ax1.step(periods, remaining, where="post", label="Actual")
+    ax1.set_title(title)
+    ax1.set_ylabel("Remaining hours")
+    ax1.legend(loc="upper right")
+
+    ax2 = ax1.twinx()
+    ax2.bar(periods, sums, width=6 if timeframe == "week" else 20, color="orange", label="Hours", alpha=0.25)
+    ax2.set_ylabel(f"Burned hours by {timeframe}")
+
+    _month_axis(ax1)
+    return figure
+
+
+def bar_chart(periods, sums, ylabel: str, color: str = "red", width: float = 9) -> Figure:
+    '''the hours of each period as bars'''
+    figure = _figure()
+    axes = figure.add_subplot()
+    axes.bar(periods, sums, width=width, color=color, label="Hours")
+    axes.set_ylabel(ylabel)
+
+    _month_axis(axes)
+    return figure
+
+
+def render(figure: Figure, format: str = "png") -> bytes:
+    '''the figure as png or svg'''
+    if format not in FORMATS:
+        raise ValueError(f"unknown chart format {format}")
+    with BytesIO() as buffer:
+        figure.savefig(buffer, format=format, dpi=DPI, bbox_inches="tight")
+        return buffer.getvalue()
@@ -24,7 +24,7 @@ class ProjectForm(ModelForm):
 
     class Meta:
         model = Project
-        fields = ["oracle_id", "name", "sold_hours", "start_date", "end_date", "type"]
+        fields = ["oracle_id", "name", "sold_hours", "start_date", "end_date", "type", "ideal_shape"]
         widgets = {
             "start_date": DateInput(),
             "end_date": DateInput(),
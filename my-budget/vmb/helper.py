@@ -1,295 +1,219 @@
-import base64
-import matplotlib
-
-matplotlib.use("SVG")
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-
-from django.db.models import Sum
+from datetime import date, timedelta
+from django.db.models import DecimalField, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import NullIf
 from django.db.models.manager import BaseManager
-from django.db.models.functions import TruncMonth, TruncWeek
-from io import BytesIO
-from .models import Project, Project_Group, TimecardItems, Milestone
+from matplotlib.figure import Figure
 
+import numpy as np
+import pandas as pd
 
-def burndown(project: Project, timeframe: str) -> dict:
+from .analytics import GroupAnalytics, ProjectAnalytics, rollup_line, team_lines
+from .chartcache import cached_chart
+from .charts import bar_chart, burndown_chart, render
+from .models import ExpenditureRollup, MonthlyRollup, Project, Project_Group, TimecardRollup, Milestone, PROJECT_TYPES
 
-    data = project.expenditureitem_set.filter(uom="Hours")
 
+def expenditure_burndown_series(project: Project, timeframe: str):
+    '''the periods, the hours burned in each and the hours remaining after it, from one query'''
     if timeframe == "month":
-        hours = (
-            data.annotate(month=TruncMonth("item_date"))
-            .values("month")
-            .annotate(sum=Sum("quantity"))
-        )
-        time = hours.values_list("month", flat="True")
+        hours = calculate_hours_by_month(project.monthlyrollup_set.filter(kind="expenditures"))
+        period = "month"
     else:
         hours = (
-            data.annotate(week=TruncWeek("item_date"))
-            .values("week")
+            project.expenditurerollup_set.values("week")
+            .order_by("week")
             .annotate(sum=Sum("quantity"))
         )
-        time = hours.values_list("week", flat="True")
+        period = "week"
 
-    sums = hours.values_list("sum", flat="True")
+    time, sums = [], []
+    for line in hours:
+        time.append(line[period])
+        sums.append(float(line["sum"]))
 
     burned = []
-    cumulated = project.sold_hours
+    cumulated = float(project.sold_hours)
     for i in sums:
         cumulated -= i
         burned.append(cumulated)
 
-    plt.clf()
-    fig, ax1 = plt.subplots(figsize=(7, 4))
-    fig.tight_layout()
-
-    #ibd_timeframe, ibd_hours_left = project.ideal_burndown_by_month()
-    ibd_timeframe, ibd_hours_left = project.ideal_burndown_by_weeks()
+    return time, sums, burned
 
-    ax1.plot(ibd_timeframe, ibd_hours_left, linestyle="dashed", color="green", label="Ideal")
-    ax1.step(time, burned, where="post", label="Actual")
-    ax1.set_title(f"Burn down chart for {project.oracle_id} ")
-    ax1.set_ylabel("Remaining hours")
-    ax1.legend(loc="upper right")
 
-    #plt.bar(months, sums, width=9)
-    plt.xticks(rotation=20)
+def timecard_burndown_series(project: Project, timeframe: str, analytics: ProjectAnalytics = None):
+    if analytics is None:
+        analytics = ProjectAnalytics(project)
+    return analytics.burndown(timeframe)
 
-    ax2 = ax1.twinx()
-    ax2.bar(time, sums, width=6, color="orange", label="Hours", alpha=0.25)
-    ax2.set_ylabel("Burned hours by week")
 
-    # Set the locator
-    locator = mdates.MonthLocator()  # every month
-    # Specify the format - %b gives us Jan, Feb...
-    fmt = mdates.DateFormatter('%b %Y')
-    X = plt.gca().xaxis
-    X.set_major_locator(locator)
-    # Specify formatter
-    X.set_major_formatter(fmt)
+PROJECT_SERIES = {
+    "timecards": timecard_burndown_series,
+    "expenditures": expenditure_burndown_series,
+}
 
-    buffer = BytesIO()
-    plt.savefig(buffer, format="png", dpi=96, bbox_inches="tight")
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    
-    graphic = base64.b64encode(image_png)
-    graphic = graphic.decode("utf-8")
+TIMEFRAMES = ("week", "month")
 
-    #memory management
-    buffer.close()
-    plt.close()
 
-    return {"image": graphic}
-
-def burndown_by_timecards(project: Project, timeframe: str) -> dict:
+def burndown_series(project: Project, kind: str, timeframe: str) -> dict:
+    """
+    the series of a burndown chart for the browser: the ideal and the actual
+    remaining hours and the hours burned by period, kind is timecards or
+    expenditures
+    """
+    time, sums, burned = PROJECT_SERIES[kind](project, timeframe)
+    ibd_timeframe, ibd_hours_left = project.ideal_burndown_by_weeks()
+    return {
+        "title": f"Burn down chart for {project.oracle_id}",
+        "timeframe": timeframe,
+        "periods": [period.isoformat() for period in time],
+        "burned": sums,
+        "remaining": burned,
+        "ideal": {
+            "periods": np.datetime_as_string(ibd_timeframe).tolist(),
+            "remaining": ibd_hours_left.tolist(),
+        },
+    }
+
+
+def group_hours_series(project_group: Project_Group, analytics: GroupAnalytics = None) -> dict:
+    '''the hours by month of a group for the browser'''
+    if analytics is None:
+        analytics = GroupAnalytics(project_group)
+    time, sums = analytics.series()
+    return {
+        "title": f"Hours by month for {project_group.name}",
+        "timeframe": "month",
+        "periods": [period.isoformat() for period in time],
+        "burned": sums,
+    }
+
+
+def project_chart(project: Project, kind: str, timeframe: str, format: str = "png") -> bytes:
+    """
+    the rendered burndown chart of a project from the chart cache, kind is
+    timecards or expenditures
+    """
+    def figure() -> Figure:
+        time, sums, burned = PROJECT_SERIES[kind](project, timeframe)
+        ibd_timeframe, ibd_hours_left = project.ideal_burndown_by_weeks()
+        return burndown_chart(
+            f"Burn down chart for {project.oracle_id} ", time, sums, burned, ibd_timeframe, ibd_hours_left, timeframe
+        )
 
-    data = project.timecarditems_set.all()
+    return cached_chart(
+        kind, project.oracle_id, timeframe, project.data_version, format, lambda: render(figure(), format)
+    )
 
-    if timeframe == "month":
-        hours = (
-            data.annotate(month=TruncMonth("start_date"))
-            .values("month")
-            .annotate(sum=Sum("total_hours"))
-        )
-        time = hours.values_list("month", flat="True")
-    else:
-        hours = (
-            data.annotate(week=TruncWeek("start_date"))
-            .values("week")
-            .annotate(sum=Sum("total_hours"))
-        )
-        time = hours.values_list("week", flat="True")
 
-    sums = hours.values_list("sum", flat="True")
+def project_group_chart(project_group: Project_Group, version: str, format: str = "png") -> bytes:
+    '''the rendered hours by month of a group from the chart cache'''
+    def figure() -> Figure:
+        time, sums = GroupAnalytics(project_group).series()
+        return bar_chart(time, sums, "Burned hours by month")
 
-    burned = []
-    cumulated = project.sold_hours
-    for i in sums:
-        cumulated -= i
-        burned.append(cumulated)
+    return cached_chart(
+        "group", project_group.id, "month", version, format, lambda: render(figure(), format)
+    )
 
-    plt.clf()
-    fig, ax1 = plt.subplots(figsize=(7, 4))
-    fig.tight_layout()
 
-    #ibd_timeframe, ibd_hours_left = project.ideal_burndown_by_month()
-    ibd_timeframe, ibd_hours_left = project.ideal_burndown_by_weeks()
+def calculate_hours_by_month(monthly_rollups: BaseManager[MonthlyRollup]):
+    '''returns total hours by month'''
+    hours_by_month = (
+        monthly_rollups.values("month")
+        .order_by("month")
+        .annotate(sum=Sum("hours"))
+    )
+    return hours_by_month
 
-    ax1.plot(ibd_timeframe, ibd_hours_left, linestyle="dashed", color="green", label="Ideal")
-    ax1.step(time, burned, where="post", label="Actual")
-    ax1.set_title(f"Burn down chart for {project.oracle_id} ")
-    ax1.set_ylabel("Remaining hours")
-    ax1.legend(loc="upper right")
-
-    #plt.bar(months, sums, width=9)
-    plt.xticks(rotation=20)
-
-    ax2 = ax1.twinx()
-    ax2.bar(time, sums, width=6, color="orange", label="Hours", alpha=0.25)
-    ax2.set_ylabel("Burned hours by week")
-
-    # Set the locator
-    locator = mdates.MonthLocator()  # every month
-    # Specify the format - %b gives us Jan, Feb...
-    fmt = mdates.DateFormatter('%b %Y')
-    X = plt.gca().xaxis
-    X.set_major_locator(locator)
-    # Specify formatter
-    X.set_major_formatter(fmt)
-
-    buffer = BytesIO()
-    plt.savefig(buffer, format="png", dpi=96, bbox_inches="tight")
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    
-    graphic = base64.b64encode(image_png)
-    graphic = graphic.decode("utf-8")
-
-    #memory management
-    buffer.close()
-    plt.close()
-
-    return {"image": graphic}
-
-def hours_by_month_by_project_group(project_group: Project_Group) -> dict:
+def calculate_hours_by_team_and_milestone(reported_timecards: BaseManager[TimecardRollup]):
     """
-    Creates a bar-chart with sum hours by month for a Project Group
+    returns one line by team with the hours by milestone, milestones with
+    the same name are summed up. All sums come from a single grouped query
+    which is pivoted in memory, teams without hours for a milestone get None.
+    Works on the weekly rollups as well as on the TimecardItems of a month.
     """
-    project_list = project_group.get_projects()
-
-    data = TimecardItems.objects.filter(project__in=project_list)
+    sums = (
+        reported_timecards.values_list("team", "milestone", "milestone__name")
+        .order_by()
+        .annotate(sum=Sum("total_hours"))
+    )
+    frame = pd.DataFrame.from_records(
+        list(sums), columns=["team", "milestone", "milestone_name", "hours"]
+    ).astype({"hours": "float64"})
+    return team_lines(frame)
 
-    hours = (
-            data.annotate(month=TruncMonth("start_date"))
-            .values("month")
-            .annotate(sum=Sum("total_hours"))
+def expenditure_milestone_rollup(data: BaseManager[ExpenditureRollup]) -> list:
+    """
+    returns hours, sold hours, delta and display name for every task with
+    expenditures, all from a single grouped query. Expenditures only know
+    the task, so the milestone of the task is looked up by a subquery.
+    Tasks without milestone keep their task number and have no delta.
+    """
+    milestones = Milestone.objects.filter(
+        project=OuterRef("project"), task=OuterRef("task")
+    ).order_by("id")
+    sums = (
+        data.values("project", "task")
+        .order_by("task")
+        .annotate(
+            sum=Sum("quantity"),
+            milestone_name=Subquery(milestones.values("name")[:1]),
+            sold_hours=Subquery(milestones.values("sold_hours")[:1]),
         )
-    time = hours.values_list("month", flat="True")
-
-    sums = hours.values_list("sum", flat="True")
-
-    plt.clf()
+    )
+    return [
+        rollup_line(line["task"], line["milestone_name"], line["sum"], line["sold_hours"])
+        for line in sums
+    ]
 
-    fig, ax1 = plt.subplots(figsize=(7, 4))
-    fig.tight_layout()
 
-    plt.bar(time, sums, width=9)
-    plt.xticks(rotation=20)
+OVERVIEW_SORTS = (
+    "oracle_id", "type", "name", "start_date", "end_date", "hours_sum", "sold_hours", "hours_left", "ratio"
+)
 
-    ax1.bar(time, sums, width=9, color="red", label="Hours")
-    ax1.set_ylabel("Burned hours by month")
 
-    # Set the locator
-    locator = mdates.MonthLocator()  # every month
-    # Specify the format - %b gives us Jan, Feb...
-    fmt = mdates.DateFormatter('%b %Y')
-    X = plt.gca().xaxis
-    X.set_major_locator(locator)
-    # Specify formatter
-    X.set_major_formatter(fmt)
+def project_overview(hours_sum: Sum, params) -> BaseManager[Project]:
+    """
+    returns the projects with reported hours annotated with hours_sum,
+    hours_left and ratio in a single query, filtered and sorted by the
+    request parameters group, type, overrun, ending (days) and sort
+    """
+    projects = (
+        Project.objects.annotate(hours_sum=hours_sum)
+        .filter(hours_sum__isnull=False)
+        .annotate(
+            hours_left=ExpressionWrapper(
+                F("sold_hours") - F("hours_sum"), output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+            ratio=ExpressionWrapper(
+                100.0 * F("hours_sum") / NullIf(F("sold_hours"), 0, output_field=FloatField()),
+                output_field=FloatField(),
+            ),
+        )
+    )
 
-    buffer = BytesIO()
-    plt.savefig(buffer, format="png", dpi=96, bbox_inches="tight")
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    
-    graphic = base64.b64encode(image_png)
-    graphic = graphic.decode("utf-8")
+    group = params.get("group")
+    if group and group.isdigit():
+        projects = projects.filter(project_group=group)
 
-    #memory management
-    buffer.close()
-    plt.close()
+    project_type = params.get("type")
+    if project_type in dict(PROJECT_TYPES):
+        projects = projects.filter(type=project_type)
 
-    return {"image": graphic}
+    if params.get("overrun"):
+        projects = projects.filter(hours_left__lt=0)
 
-#
-# helper methods for getting data from the db
-#
+    today = date.today()
+    ending = params.get("ending")
+    if ending and ending.isdigit():
+        projects = projects.filter(end_date__gte=today, end_date__lte=today + timedelta(days=int(ending)))
 
-def calculate_hours_by_month(reported_timecards: BaseManager[TimecardItems]):
-    '''returns total hours by month'''
-    hours_by_month = (
-        reported_timecards.annotate(month=TruncMonth("start_date"))
-        .values("month")
-        .annotate(sum=Sum("total_hours"))
-    )
-    return hours_by_month
+    sort = params.get("sort", "oracle_id")
+    if sort.removeprefix("-") not in OVERVIEW_SORTS:
+        sort = "oracle_id"
+    projects = projects.order_by(sort, "oracle_id")
 
-def calculate_hours_sum(reported_timecards: BaseManager[TimecardItems]):
-    '''returns an aggregates sum of all hours provided in the reported timecards'''
-    return reported_timecards.aggregate(sum=Sum("total_hours"))
-
-def calculate_hours_by_team_and_milestone(reported_timecards: BaseManager[TimecardItems]):
-    milestones_with_hours = reported_timecards.values("milestone").distinct()
-    teams_with_hours = reported_timecards.values('team').distinct()
-    teams_lines = []
-
-    for team_with_hours in teams_with_hours:
-        team_name = team_with_hours['team']
-        sums_by_team_and_milestone = []
-        for milestone_with_hours in milestones_with_hours:
-            milestone_id = milestone_with_hours['milestone']
-            milestone = Milestone.objects.get(id=milestone_id)
-            hours_by_milestone_and_team = TimecardItems.objects.filter(
-                team=team_name, milestone=milestone_id)
-            sum = hours_by_milestone_and_team.aggregate(sum=Sum("total_hours"))
-
-            updated = False
-            for milestone_entry in sums_by_team_and_milestone:
-                milestone_name = milestone_entry["milestone"]
-                if milestone_name == milestone.get_name_display():
-                    if milestone_entry["hours"]["sum"] != None and sum["sum"] != None:
-                        milestone_entry["hours"]["sum"] = milestone_entry["hours"]["sum"] + sum["sum"]
-                    elif milestone_entry["hours"]["sum"] == None and sum["sum"] != None:
-                        milestone_entry["hours"]["sum"] = sum["sum"]
-                    updated = True
-
-            if not updated:
-                sums_by_team_and_milestone.append(
-                    {"milestone":milestone.get_name_display(), "hours":sum}
-                )
-        teams_lines.append(
-            {"team": team_with_hours, "sums":sums_by_team_and_milestone}
-        )
-    
-    teams_lines = sorted(teams_lines, key=lambda item: item['team']['team'] )
-    return teams_lines
-
-def calculate_hours_by_milestone(reported_timecards: BaseManager[TimecardItems]):
-    milestones_with_hours = reported_timecards.values("milestone").distinct()
-
-    milestone_list = dict()
-    for milestone_with_hours in milestones_with_hours:
-            milestone_id = milestone_with_hours['milestone']
-            milestone = Milestone.objects.get(id=milestone_id)
-            hours_by_milestone_and_team = TimecardItems.objects.filter(
-                milestone=milestone_id)
-            sum = hours_by_milestone_and_team.aggregate(sum=Sum("total_hours"))
-
-            if milestone.get_name_display() not in milestone_list:
-                milestone_list[milestone.get_name_display()] = sum["sum"]
-            else :
-                cumulated = milestone_list[milestone.get_name_display()] + sum["sum"]
-                milestone_list.update({milestone.get_name_display(): cumulated})
-
-    return (milestone_list)
-
-def calculate_hours_and_delta_by_milestone(reported_timecards: BaseManager[TimecardItems]):
-    milestones_with_hours = reported_timecards.values("milestone").distinct()
-    
-    sums_by_milestone = []
-    for milestone_with_hours in milestones_with_hours:
-        milestone_id = milestone_with_hours['milestone']
-        milestone = Milestone.objects.get(id=milestone_id)
-        hours_by_milestone = TimecardItems.objects.filter(milestone=milestone_id)
-        sum = hours_by_milestone.aggregate(sum=Sum("total_hours"))
-
-        delta = float("NaN")
-        if milestone != None:
-            task = milestone.get_name_display()
-            delta = milestone.sold_hours - sum["sum"]
-        sums_by_milestone.append(
-            {"task": task, "sum": sum, "milestone": milestone, "delta": delta}
-        )
-    return sums_by_milestone
+    for project in projects:
+        days_left = (project.end_date - today).days
+        project.days_left = days_left if days_left >= 0 else "-"
+    return projects
@@ -0,0 +1,71 @@
+from datetime import date
+from functools import lru_cache
+from logging import getLogger
+
+import numpy as np
+
+from .tools import diff_month, diff_weeks
+
+
+logger = getLogger(__name__)
+
+IDEAL_SHAPES = (
+    ("linear", "Linear"),
+    ("front", "Front-loaded"),
+    ("s", "S-curve"),
+    ("milestones", "Milestone-weighted"),
+)
+
+
+def _burned_share(progress: np.ndarray, shape: str, weights: tuple) -> np.ndarray:
+    '''the share of the sold hours burned once the given share of the runtime is over'''
+    if shape == "linear":
+        return progress
+    if shape == "front":
+        return 1 - (1 - progress) ** 2
+    if shape == "s":
+        return progress**2 * (3 - 2 * progress)
+    if shape == "milestones":
+        # one phase of equal length by milestone, each burning its own sold hours
+        weights = np.asarray(weights, dtype="float64")
+        if not weights.size or weights.sum() <= 0:
+            return progress
+        phases = np.linspace(0, 1, weights.size + 1)
+        return np.interp(progress, phases, np.concatenate([[0], np.cumsum(weights) / weights.sum()]))
+    raise ValueError(f"unknown ideal burndown shape {shape}")
+
+
+def _months(start: date, count: int) -> np.ndarray:
+    '''start plus 0 to count - 1 months, days past the end of a month are clipped like DateOffset'''
+    months = np.datetime64(start.replace(day=1), "M") + np.arange(count)
+    firsts = months.astype("datetime64[D]")
+    lengths = ((months + 1).astype("datetime64[D]") - firsts).astype("int64")
+    return firsts + np.minimum(start.day, lengths) - 1
+
+
+@lru_cache(maxsize=1024)
+def ideal_burndown(sold_hours: float, start: date, end: date, timeframe: str = "week", shape: str = "linear", weights: tuple = ()):
+    """
+    the ideal burndown of sold_hours between start and end as two read-only
+    arrays: the first day of every week or month and the hours left at its
+    end. shape spreads the hours linearly, front-loaded, along an S-curve or
+    by the sold hours of the milestones given as weights. The curves are
+    memoized, so they are computed once for every set of arguments.
+    """
+    if timeframe == "month":
+        runtime = diff_month(end, start)
+        periods = _months(start, max(runtime, 0))
+    else:
+        runtime = diff_weeks(start, end)
+        periods = np.datetime64(start, "D") + 7 * np.arange(max(int(runtime), 0))
+
+    if runtime <= 0:
+        remaining = np.zeros(0)
+    else:
+        shares = _burned_share(np.arange(1, periods.size + 1) / runtime, shape, weights)
+        burned = np.diff(shares, prepend=0.0) * float(sold_hours)
+        remaining = float(sold_hours) - np.cumsum(burned)
+
+    periods.flags.writeable = False
+    remaining.flags.writeable = False
+    return periods, remaining
@@ -0,0 +1,662 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from io import StringIO
+from logging import getLogger
+from typing import NamedTuple
+
+import django
+import hashlib
+import multiprocessing
+import os
+import pandas as pd
+
+from .models import ExpenditureItem, ImportedFile, Milestone, Project, TimecardItems, TASK_TYPES
+from .rollups import add_expenditures, add_timecards
+
+
+logger = getLogger(__name__)
+
+TASK_TYPE_CHOICES = dict([i[::-1] for i in TASK_TYPES])
+
+#
+# the columns of the timecard export we are interested in
+#
+TIMECARD_ID = "Timecard Split ID"
+TIMECARD_PROJECT = "Project: OPA Project Number"
+TIMECARD_MILESTONE_TASK = "Milestone: OPA Task Number"
+TIMECARD_MILESTONE_NAME = "Milestone: Milestone Name"
+TIMECARD_START_DATE = "Start Date"
+TIMECARD_NAME = "Resource: Full Name"
+TIMECARD_TOTAL_HOURS = "Total Hours"
+TIMECARD_DELIVERY_LOCATION = "Delivery Location"
+TIMECARD_NOTES_WEEK = "Timecard Notes week"
+TIMECARD_NOTES_FRIDAY = "Friday Notes"
+
+TIMECARD_DATE_FORMAT = "%m/%d/%Y"
+
+# only these columns are read, low cardinality columns as categories
+TIMECARD_DTYPES = {
+    TIMECARD_ID: "str",
+    TIMECARD_PROJECT: "int64",
+    TIMECARD_MILESTONE_TASK: "category",
+    TIMECARD_MILESTONE_NAME: "category",
+    TIMECARD_START_DATE: "str",
+    TIMECARD_NAME: "str",
+    TIMECARD_TOTAL_HOURS: "float64",
+    TIMECARD_DELIVERY_LOCATION: "category",
+    TIMECARD_NOTES_WEEK: "str",
+    TIMECARD_NOTES_FRIDAY: "str",
+}
+
+#
+# the columns of the oracle expenditure export we are interested in
+#
+EXPENDITURE_TRANS_ID = "Trans Id"
+EXPENDITURE_PROJECT = "Project"
+EXPENDITURE_TASK = "Task"
+EXPENDITURE_EXPND_TYPE = "Expnd Type"
+EXPENDITURE_ITEM_DATE = "Item Date"
+EXPENDITURE_EMPLOYEE_SUPPLIER = "Employee/Supplier"
+EXPENDITURE_QUANTITY = "Quantity"
+EXPENDITURE_UOM = "UOM"
+EXPENDITURE_COMMENT = "Comment"
+
+# cost columns may be empty in the export, they are stored as 0
+EXPENDITURE_COSTS = {
+    "Proj Func Burdened Cost": "proj_func_burdened_cost",
+    "Project Burdened Cost": "project_burdened_cost",
+    "Accrued Revenue": "accrued_revenue",
+    "Bill Amount": "bill_amount",
+}
+
+EXPENDITURE_DATE_FORMAT = "%d-%b-%Y"
+
+# only these columns are read, low cardinality columns as categories
+EXPENDITURE_DTYPES = {
+    EXPENDITURE_TRANS_ID: "int64",
+    EXPENDITURE_PROJECT: "int64",
+    EXPENDITURE_TASK: "category",
+    EXPENDITURE_EXPND_TYPE: "category",
+    EXPENDITURE_ITEM_DATE: "str",
+    EXPENDITURE_EMPLOYEE_SUPPLIER: "str",
+    EXPENDITURE_QUANTITY: "float64",
+    EXPENDITURE_UOM: "category",
+    **{column: "float64" for column in EXPENDITURE_COSTS},
+    EXPENDITURE_COMMENT: "str",
+}
+
+
+def _as_text(column: pd.Series) -> pd.Series:
+    '''turns a column into python strings, missing values become empty strings'''
+    return column.astype(object).where(column.notna(), "").map(str)
+
+
+def _as_task(column: pd.Series) -> pd.Series:
+    '''task numbers are stored as written in the export'''
+    return column.astype(object).map(str)
+
+
+def read_chunks(abs_file_path: str, sep: str, encoding: str, dtypes: dict, chunk_size: int = None):
+    """
+    reads the file as a stream of data frames with at most chunk_size rows,
+    only the columns listed in dtypes are parsed
+    """
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    return pd.read_csv(
+        abs_file_path,
+        sep=sep,
+        encoding=encoding,
+        usecols=list(dtypes),
+        dtype=dtypes,
+        chunksize=chunk_size,
+    )
+
+
+def resolve_projects(project_ids) -> dict:
+    """
+    returns a dict oracle_id -> Project for all given ids, projects
+    that are not known yet are created in one batch
+    """
+    project_ids = {int(project_id) for project_id in project_ids}
+    projects = Project.objects.in_bulk(project_ids)
+
+    missing = [
+        Project(
+            oracle_id=project_id,
+            name=project_id,
+            sold_hours=1,
+            start_date="1976-01-01",
+            end_date=datetime.now(),
+        )
+        for project_id in sorted(project_ids - projects.keys())
+    ]
+    if missing:
+        Project.objects.bulk_create(
+            missing, batch_size=settings.IMPORT_BATCH_SIZE, ignore_conflicts=True
+        )
+        for project in missing:
+            logger.info("Created Project for Oracle ID %s", project.oracle_id)
+        projects = Project.objects.in_bulk(project_ids)
+
+    return projects
+
+
+def resolve_milestones(wanted: pd.DataFrame) -> dict:
+    """
+    returns a dict (project_id, task) -> milestone id for all combinations
+    in wanted (columns project_id, task, name), unknown milestones are
+    created in one batch
+    """
+    project_ids = wanted["project_id"].unique().tolist()
+
+    milestones = {}
+    existing = (
+        Milestone.objects.filter(project_id__in=project_ids)
+        .order_by("id")
+        .values_list("project_id", "task", "id")
+    )
+    for project_id, task, milestone_id in existing:
+        # same as .first() - the oldest milestone for the task wins
+        milestones.setdefault((project_id, task), milestone_id)
+
+    wanted = wanted.drop_duplicates(subset=["project_id", "task"])
+    missing = [
+        Milestone(
+            project_id=project_id,
+            task=task,
+            name=name,
+            cost_per_hour=0,
+            sold_hours=0,
+        )
+        for project_id, task, name in zip(wanted["project_id"], wanted["task"], wanted["name"])
+        if (project_id, task) not in milestones
+    ]
+    if missing:
+        Milestone.objects.bulk_create(missing, batch_size=settings.IMPORT_BATCH_SIZE)
+        for milestone in missing:
+            logger.info(f"Created milestone {milestone.task} for project {milestone.project_id}")
+        return resolve_milestones(wanted)
+
+    return milestones
+
+
+# keys looked up in one query, below the 999 variables older SQLite allows by statement
+KEY_BATCH_SIZE = 900
+
+
+def existing_keys(model, keys: pd.Series) -> set:
+    """
+    returns those of the given primary keys of model that are already
+    stored, looked up in batches of KEY_BATCH_SIZE on the primary key index
+    """
+    pk_name = model._meta.pk.name
+    keys = keys.drop_duplicates().tolist()
+    existing = set()
+    for start in range(0, len(keys), KEY_BATCH_SIZE):
+        batch = keys[start : start + KEY_BATCH_SIZE]
+        existing.update(model.objects.filter(pk__in=batch).values_list(pk_name, flat=True))
+    return existing
+
+
+def periods(dates: pd.Series):
+    '''the monday of the week and the first of the month of every date'''
+    weeks = dates.dt.normalize() - pd.to_timedelta(dates.dt.weekday, unit="D")
+    months = dates.dt.to_period("M").dt.start_time
+    return weeks.dt.date, months.dt.date
+
+
+def normalize_timecards(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    turns the raw timecard export into a frame with one column per
+    TimecardItems field, rows already carry their final values
+    """
+    frame = pd.DataFrame(index=data.index)
+    frame["timecard_id"] = _as_text(data[TIMECARD_ID])
+    frame["project_id"] = data[TIMECARD_PROJECT].astype("int64")
+    frame["task"] = _as_task(data[TIMECARD_MILESTONE_TASK])
+
+    milestone_names = data[TIMECARD_MILESTONE_NAME]
+    frame["milestone_name"] = milestone_names.map(TASK_TYPE_CHOICES)
+    unknown = frame["milestone_name"].isna()
+    if unknown.any():
+        logger.warning(
+            "unknown milestone names %s, using 'Not assigned'",
+            sorted(milestone_names[unknown].astype(str).unique()),
+        )
+        frame.loc[unknown, "milestone_name"] = "na"
+
+    start_dates = pd.to_datetime(data[TIMECARD_START_DATE], format=TIMECARD_DATE_FORMAT)
+    frame["start_date"] = start_dates.dt.date
+    frame["period_week"], frame["period_month"] = periods(start_dates)
+    frame["name"] = _as_text(data[TIMECARD_NAME])
+    frame["total_hours"] = data[TIMECARD_TOTAL_HOURS].astype("float64")
+    frame["deliver_location"] = _as_text(data[TIMECARD_DELIVERY_LOCATION])
+
+    # the weekly note wins, the friday note is the fallback
+    notes_week = data[TIMECARD_NOTES_WEEK].astype(object)
+    notes_friday = data[TIMECARD_NOTES_FRIDAY].astype(object)
+    weekly_is_text = notes_week.map(lambda note: isinstance(note, str))
+    notes = notes_week.where(weekly_is_text, notes_friday)
+    frame["notes"] = _as_text(notes)
+
+    # the team is encoded in the first three characters, e.g. "T01 ..."
+    team = frame["notes"].str[:3]
+    frame["team"] = team.where(team.str.startswith("T"), "T00")
+
+    return frame
+
+
+def write_timecards(frame: pd.DataFrame, batch_size: int = None) -> int:
+    """
+    writes the normalized timecards to the database, rows that are known
+    already are skipped, returns the number of created TimecardItems
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+
+    # the first occurrence of an id wins, as well within the file
+    frame = frame.drop_duplicates(subset="timecard_id", keep="first")
+    known = frame["timecard_id"].isin(existing_keys(TimecardItems, frame["timecard_id"]))
+    if known.any():
+        logger.info("%i timecards already existing, skipping", known.sum())
+        frame = frame[~known]
+
+    if frame.empty:
+        return 0
+
+    resolve_projects(frame["project_id"].unique())
+    milestones = resolve_milestones(
+        frame[["project_id", "task", "milestone_name"]].rename(
+            columns={"milestone_name": "name"}
+        )
+    )
+
+    frame = frame.assign(
+        milestone_id=[
+            milestones[key]
+            for key in zip(frame["project_id"].tolist(), frame["task"].tolist())
+        ]
+    )
+
+    fields = [
+        "timecard_id",
+        "project_id",
+        "milestone_id",
+        "start_date",
+        "period_week",
+        "period_month",
+        "name",
+        "total_hours",
+        "deliver_location",
+        "team",
+        "notes",
+    ]
+    timecard_items = [
+        TimecardItems(**dict(zip(fields, values)))
+        for values in zip(*(frame[field].tolist() for field in fields))
+    ]
+    # the known keys are filtered out above, a conflict is an error and must not reach the rollups
+    TimecardItems.objects.bulk_create(timecard_items, batch_size=batch_size)
+    add_timecards(frame)
+
+    return len(timecard_items)
+
+
+def normalize_expenditures(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    turns the raw oracle export into a frame with one column per
+    ExpenditureItem field, rows already carry their final values
+    """
+    frame = pd.DataFrame(index=data.index)
+    frame["trans_id"] = data[EXPENDITURE_TRANS_ID].astype("int64")
+    frame["project_id"] = data[EXPENDITURE_PROJECT].astype("int64")
+    frame["task"] = _as_task(data[EXPENDITURE_TASK])
+    frame["expnd_type"] = _as_text(data[EXPENDITURE_EXPND_TYPE])
+    item_dates = pd.to_datetime(data[EXPENDITURE_ITEM_DATE], format=EXPENDITURE_DATE_FORMAT)
+    frame["item_date"] = item_dates.dt.date
+    frame["period_week"], frame["period_month"] = periods(item_dates)
+    frame["employee_supplier"] = _as_text(data[EXPENDITURE_EMPLOYEE_SUPPLIER])
+    frame["quantity"] = data[EXPENDITURE_QUANTITY].astype("float64")
+    frame["uom"] = _as_text(data[EXPENDITURE_UOM])
+
+    for column, field in EXPENDITURE_COSTS.items():
+        frame[field] = data[column].astype("float64").fillna(0.0)
+
+    comments = data[EXPENDITURE_COMMENT].astype(object)
+    frame["comment"] = comments.where(comments.notna(), None)
+
+    return frame
+
+
+def write_expenditures(frame: pd.DataFrame, batch_size: int = None) -> int:
+    """
+    writes the normalized expenditures to the database, rows that are known
+    already are skipped, returns the number of created ExpenditureItems
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+
+    frame = frame.drop_duplicates(subset="trans_id", keep="first")
+    known = frame["trans_id"].isin(existing_keys(ExpenditureItem, frame["trans_id"]))
+    if known.any():
+        logger.debug("%i Trans Ids already existing, skipping", known.sum())
+        frame = frame[~known]
+
+    if frame.empty:
+        return 0
+
+    resolve_projects(frame["project_id"].unique())
+
+    fields = [
+        "trans_id",
+        "project_id",
+        "task",
+        "expnd_type",
+        "item_date",
+        "period_week",
+        "period_month",
+        "employee_supplier",
+        "quantity",
+        "uom",
+        *EXPENDITURE_COSTS.values(),
+        "comment",
+    ]
+    expenditure_items = [
+        ExpenditureItem(**dict(zip(fields, values)))
+        for values in zip(*(frame[field].tolist() for field in fields))
+    ]
+    # the known keys are filtered out above, a conflict is an error and must not reach the rollups
+    ExpenditureItem.objects.bulk_create(expenditure_items, batch_size=batch_size)
+    add_expenditures(frame)
+
+    return len(expenditure_items)
+
+
+#
+# reading whole files
+#
+
+FILE_FORMATS = {
+    "timecards": (",", "UTF-8", TIMECARD_DTYPES, normalize_timecards, write_timecards),
+    "expenditures": ("\t", "UTF-16", EXPENDITURE_DTYPES, normalize_expenditures, write_expenditures),
+}
+
+
+def file_digest(abs_file_path: str) -> str:
+    '''returns the sha256 of the file content'''
+    with open(abs_file_path, "rb") as fp:
+        return hashlib.file_digest(fp, "sha256").hexdigest()
+
+
+class ImportClaim(NamedTuple):
+    '''the claim on the import of a file content, previous is the manifest state it replaced'''
+    sha256: str
+    previous: dict = None
+
+
+def claim_file(abs_file_path: str, sha256: str, kind: str, force: bool = False) -> ImportClaim:
+    """
+    claims the import of a file content through the manifest, returns None
+    if the content has been imported already or another process is
+    importing it right now. Claims older than IMPORT_CLAIM_TIMEOUT seconds
+    are considered abandoned and can be taken over.
+    """
+    try:
+        with transaction.atomic():
+            ImportedFile.objects.create(
+                sha256=sha256,
+                kind=kind,
+                state="importing",
+                filename=os.path.basename(abs_file_path),
+                size=os.path.getsize(abs_file_path),
+                rows=0,
+                saved_entries=0,
+            )
+        return ImportClaim(sha256)
+    except IntegrityError:
+        pass
+
+    claims = ImportedFile.objects.filter(sha256=sha256, kind=kind)
+    abandoned = timezone.now() - timedelta(seconds=settings.IMPORT_CLAIM_TIMEOUT)
+    if force:
+        claims = claims.filter(Q(state="imported") | Q(imported_at__lt=abandoned))
+    else:
+        claims = claims.filter(state="importing", imported_at__lt=abandoned)
+    previous = claims.values("state", "imported_at").first()
+    if previous is None:
+        return None
+    # only taken if nobody changed the manifest row since it was read
+    if claims.filter(**previous).update(state="importing", imported_at=timezone.now()) != 1:
+        return None
+    return ImportClaim(sha256, previous)
+
+
+def release_claim(claim: ImportClaim):
+    """
+    gives up the claim of a file that could not be imported, a file that had
+    been imported before a forced re-import counts as imported again
+    """
+    claims = ImportedFile.objects.filter(sha256=claim.sha256, state="importing")
+    if claim.previous is not None and claim.previous["state"] == "imported":
+        claims.update(**claim.previous)
+    else:
+        claims.delete()
+
+
+def record_import(filename: str, kind: str, sha256: str, size: int, rows: int, saved_entries: int):
+    '''adds the file to the manifest of imported files'''
+    ImportedFile.objects.update_or_create(
+        sha256=sha256,
+        defaults={
+            "kind": kind,
+            "state": "imported",
+            "filename": os.path.basename(filename),
+            "size": size,
+            "rows": rows,
+            "saved_entries": saved_entries,
+        },
+    )
+    logger.info(f"saved {saved_entries} entries from {filename}")
+
+
+TRANSACTION_SCOPES = ("file", "chunk")
+
+
+def _transaction(scope: str, transaction_scope: str):
+    '''an atomic block if the import runs its transactions at the given scope'''
+    return transaction.atomic() if scope == transaction_scope else nullcontext()
+
+
+def write_frames(frames, kind: str, progress=None, batch_size: int = None, transaction_scope: str = None):
+    '''writes normalized chunks, returns the number of rows and the number of saved entries'''
+    write = FILE_FORMATS[kind][4]
+    transaction_scope = transaction_scope or settings.IMPORT_TRANSACTION_SCOPE
+
+    rows = 0
+    saved_entries = 0
+    for frame in frames:
+        with _transaction("chunk", transaction_scope):
+            saved_chunk = write(frame, batch_size)
+        rows += len(frame)
+        saved_entries += saved_chunk
+        if progress is not None:
+            progress(len(frame), saved_chunk)
+
+    return rows, saved_entries
+
+
+def store_file(abs_file_path: str, kind: str, sha256: str, frames, progress=None, batch_size: int = None, transaction_scope: str = None) -> int:
+    """
+    writes the normalized chunks of a file and adds it to the manifest,
+    with transaction_scope "file" nothing of the file is stored if it fails
+    """
+    transaction_scope = transaction_scope or settings.IMPORT_TRANSACTION_SCOPE
+    with _transaction("file", transaction_scope):
+        rows, saved_entries = write_frames(frames, kind, progress, batch_size, transaction_scope)
+        record_import(
+            abs_file_path, kind, sha256, os.path.getsize(abs_file_path), rows, saved_entries
+        )
+    return saved_entries
+
+
+def parse_file(abs_file_path: str, kind: str, chunk_size: int = None):
+    """
+    yields the normalized chunks of an export of the given kind, does not
+    touch the database
+    """
+    sep, encoding, dtypes, normalize, write = FILE_FORMATS[kind]
+    with read_chunks(abs_file_path, sep, encoding, dtypes, chunk_size) as chunks:
+        for data in chunks:
+            yield normalize(data)
+
+
+def parse_records(text: str, kind: str) -> pd.DataFrame:
+    '''parses already decoded records of an export, the first line is the header'''
+    sep, encoding, dtypes, normalize, write = FILE_FORMATS[kind]
+    data = pd.read_csv(StringIO(text), sep=sep, usecols=list(dtypes), dtype=dtypes)
+    return normalize(data)
+
+
+# chunks a parse worker may put ahead of the writer
+PARSE_QUEUE_SIZE = 2
+
+
+def _parse_into(queue, abs_file_path: str, kind: str, chunk_size: int):
+    """
+    runs in a worker process, puts the normalized chunks of a file on the
+    bounded queue one by one and None once done, an error ends the file in
+    place of None. The worker waits while the queue is full, so neither it
+    nor the writer holds more than a few chunks of the file in memory.
+    """
+    try:
+        for frame in parse_file(abs_file_path, kind, chunk_size):
+            queue.put(frame)
+    except Exception as e:
+        queue.put(e)
+    else:
+        queue.put(None)
+
+
+class _QueuedChunks:
+    """
+    the chunks put on a queue by _parse_into, drain() takes the rest of
+    them off the queue if the writer stops early, so the worker can go on
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.done = False
+
+    def _get(self):
+        item = self.queue.get()
+        self.done = item is None or isinstance(item, Exception)
+        return item
+
+    def __iter__(self):
+        while not self.done:
+            item = self._get()
+            if isinstance(item, Exception):
+                raise item
+            if item is not None:
+                yield item
+
+    def drain(self):
+        while not self.done:
+            self._get()
+
+
+def import_file(abs_file_path: str, kind: str, chunk_size: int = None, force: bool = False, progress=None, batch_size: int = None, transaction_scope: str = None) -> int:
+    """
+    reads an export of the given kind chunk by chunk and stores all new
+    entries, returns the number of saved entries. Files with a content that
+    has been imported before are skipped without being parsed.
+
+    progress is called after each chunk with the number of rows read and
+    the number of entries saved for that chunk.
+    """
+    sha256 = file_digest(abs_file_path)
+    claim = claim_file(abs_file_path, sha256, kind, force)
+    if claim is None:
+        logger.info(f"{abs_file_path} has been imported already, skipping")
+        return 0
+
+    try:
+        frames = parse_file(abs_file_path, kind, chunk_size)
+        return store_file(abs_file_path, kind, sha256, frames, progress, batch_size, transaction_scope)
+    except BaseException:
+        release_claim(claim)
+        raise
+
+
+def import_files(abs_file_paths: list, kind: str, chunk_size: int = None, force: bool = False, progress=None, workers: int = None, batch_size: int = None, transaction_scope: str = None):
+    """
+    imports several exports of the given kind and yields a tuple
+    (abs_file_path, saved_entries, error) for every file once it is done.
+
+    With more than one worker the files are parsed and normalized in a pool
+    of processes, while this process stays the only one writing to the
+    database. The workers hand the chunks over through bounded queues, so
+    memory stays bounded by a few chunks of IMPORT_CHUNK_SIZE rows.
+    """
+    workers = workers or settings.IMPORT_PARSE_WORKERS
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+
+    if workers < 2 or len(abs_file_paths) < 2:
+        for abs_file_path in abs_file_paths:
+            try:
+                saved_entries = import_file(
+                    abs_file_path, kind, chunk_size, force, progress, batch_size, transaction_scope
+                )
+                yield abs_file_path, saved_entries, None
+            except Exception as e:
+                logger.exception(f"could not import {abs_file_path}")
+                yield abs_file_path, 0, e
+        return
+
+    # claims that are neither stored nor released yet, released if the import stops early
+    pending = {}
+    try:
+        for abs_file_path in dict.fromkeys(abs_file_paths):
+            claim = claim_file(abs_file_path, file_digest(abs_file_path), kind, force)
+            if claim is None:
+                logger.info(f"{abs_file_path} has been imported already, skipping")
+                yield abs_file_path, 0, None
+            else:
+                pending[abs_file_path] = claim
+
+        if not pending:
+            return
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(pending)), mp_context=context, initializer=django.setup
+        ) as pool, context.Manager() as manager:
+            queues = {abs_file_path: manager.Queue(PARSE_QUEUE_SIZE) for abs_file_path in pending}
+            for abs_file_path, queue in queues.items():
+                pool.submit(_parse_into, queue, abs_file_path, kind, chunk_size)
+            try:
+                # in the order the files were submitted, so the file being written is always parsed
+                for abs_file_path, queue in queues.items():
+                    chunks = _QueuedChunks(queue)
+                    try:
+                        saved_entries = store_file(
+                            abs_file_path, kind, pending[abs_file_path].sha256, chunks,
+                            progress, batch_size, transaction_scope,
+                        )
+                        del pending[abs_file_path]
+                        error = None
+                    except Exception as e:
+                        logger.exception(f"could not import {abs_file_path}")
+                        release_claim(pending.pop(abs_file_path))
+                        saved_entries, error = 0, e
+                    finally:
+                        chunks.drain()
+                    yield abs_file_path, saved_entries, error
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+    finally:
+        for claim in pending.values():
+            release_claim(claim)
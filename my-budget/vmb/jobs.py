@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from logging import getLogger
+
+from .importer import import_files
+from .locks import ImportRunning, import_lock
+from .models import ImportJob
+
+
+logger = getLogger(__name__)
+
+executor = None
+
+
+def start():
+    '''creates the pool the import jobs are running in, called once the app is ready'''
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.IMPORT_WORKERS, thread_name_prefix="vmb-import"
+        )
+
+
+def create_import_job(kind: str, filenames: list) -> ImportJob:
+    """
+    creates a job importing the given files and hands it to the pool,
+    returns at once
+    """
+    job = ImportJob.objects.create(
+        kind=kind, filenames="\n".join(filenames), files=len(filenames)
+    )
+    if settings.IMPORT_JOBS_ASYNC:
+        start()
+        executor.submit(_run_in_thread, job.id)
+    else:
+        run_import_job(job.id)
+    return job
+
+
+def _run_in_thread(job_id: int):
+    close_old_connections()
+    try:
+        run_import_job(job_id)
+    except Exception:
+        logger.exception(f"import job {job_id} failed")
+        ImportJob.objects.filter(id=job_id).update(status="failed", finished=timezone.now())
+    finally:
+        close_old_connections()
+
+
+def run_import_job(job_id: int):
+    '''imports all files of the job, the progress is stored after every chunk'''
+    job = ImportJob.objects.get(id=job_id)
+    job.status = "running"
+    job.save(update_fields=["status"])
+
+    jobs = ImportJob.objects.filter(id=job_id)
+
+    def progress(rows, saved_entries):
+        jobs.update(
+            rows_parsed=F("rows_parsed") + rows,
+            rows_inserted=F("rows_inserted") + saved_entries,
+            rows_skipped=F("rows_skipped") + rows - saved_entries,
+        )
+
+    errors = []
+    try:
+        with import_lock():
+            for abs_file_path, saved_entries, error in import_files(job.get_filenames(), job.kind, progress=progress):
+                if error is not None:
+                    errors.append(f"{abs_file_path}: {error}")
+                    jobs.update(errors="\n".join(errors))
+                jobs.update(files_done=F("files_done") + 1)
+    except ImportRunning as e:
+        errors.append(str(e))
+        jobs.update(errors="\n".join(errors))
+
+    jobs.update(status="failed" if errors else "done", finished=timezone.now())
+    logger.info(f"import job {job_id} finished")
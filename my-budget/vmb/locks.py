@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from logging import getLogger
+
+import os
+import socket
+import threading
+
+from .models import ImportLock
+
+
+logger = getLogger(__name__)
+
+IMPORT_LOCK = "import"
+
+
+class ImportRunning(Exception):
+    """raised if another process or thread is importing already"""
+
+    def __init__(self, lock: ImportLock = None):
+        self.lock = lock
+        super().__init__("An import is already running, please try again once it has finished.")
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def is_import_running() -> bool:
+    abandoned = timezone.now() - timedelta(seconds=settings.IMPORT_LOCK_TIMEOUT)
+    return ImportLock.objects.filter(name=IMPORT_LOCK, acquired_at__gte=abandoned).exists()
+
+
+@contextmanager
+def import_lock():
+    """
+    holds the import lock while the block runs, raises ImportRunning if it
+    is held by someone else. Locks older than IMPORT_LOCK_TIMEOUT seconds are
+    considered abandoned and taken over.
+    """
+    owner = _owner()
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            ImportLock.objects.create(name=IMPORT_LOCK, owner=owner, acquired_at=now)
+    except IntegrityError:
+        abandoned = now - timedelta(seconds=settings.IMPORT_LOCK_TIMEOUT)
+        taken_over = ImportLock.objects.filter(
+            name=IMPORT_LOCK, acquired_at__lt=abandoned
+        ).update(owner=owner, acquired_at=now)
+        if not taken_over:
+            raise ImportRunning(ImportLock.objects.filter(name=IMPORT_LOCK).first())
+        logger.warning("took over an abandoned import lock")
+
+    try:
+        yield
+    finally:
+        ImportLock.objects.filter(name=IMPORT_LOCK, owner=owner).delete()
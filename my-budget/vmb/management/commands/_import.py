@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+import glob
+import os
+import resource
+import sys
+import time
+
+from vmb.importer import TRANSACTION_SCOPES, import_files
+from vmb.locks import ImportRunning, import_lock
+
+
+def peak_rss_mb() -> float:
+    '''peak resident memory of this process and its finished workers in MB'''
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class ImportCommand(BaseCommand):
+    """
+    shared implementation of import_timecards and import_expenditures,
+    subclasses set kind and root
+    """
+
+    kind = None
+    root = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            help="files, globs or directories to import, defaults to the upload folder",
+        )
+        parser.add_argument("--batch-size", type=int, help="rows by INSERT statement")
+        parser.add_argument("--chunk-size", type=int, help="rows read from a file at once")
+        parser.add_argument("--workers", type=int, help="processes parsing files in parallel")
+        parser.add_argument(
+            "--transaction",
+            choices=TRANSACTION_SCOPES,
+            help="commit after every chunk or once by file",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="import files again even if their content has been imported before",
+        )
+
+    def find_files(self, paths) -> list:
+        '''expands directories and globs into a sorted list of files'''
+        files = []
+        for path in paths or [getattr(settings, self.root)]:
+            if os.path.isdir(path):
+                filenames = next(os.walk(path), (None, None, []))[2]
+                files.extend(os.path.join(path, filename) for filename in sorted(filenames))
+            elif glob.has_magic(path):
+                files.extend(sorted(filter(os.path.isfile, glob.glob(path))))
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                raise CommandError(f"{path} does not exist")
+        return [os.path.abspath(file) for file in files]
+
+    def handle(self, *args, **options):
+        files = self.find_files(options["paths"])
+        size = sum(os.path.getsize(file) for file in files)
+        self.stdout.write(f"importing {len(files)} file(s), {size / 1e6:.1f} MB")
+
+        rows = 0
+
+        def progress(rows_read, saved_entries):
+            nonlocal rows
+            rows += rows_read
+
+        start = time.perf_counter()
+        saved_entries = 0
+        failed = 0
+        try:
+            with import_lock():
+                results = import_files(
+                    files,
+                    self.kind,
+                    chunk_size=options["chunk_size"],
+                    force=options["force"],
+                    progress=progress,
+                    workers=options["workers"],
+                    batch_size=options["batch_size"],
+                    transaction_scope=options["transaction"],
+                )
+                for file, saved, error in results:
+                    if error is None:
+                        self.stdout.write(f"{file}: {saved} entries saved")
+                    else:
+                        failed += 1
+                        self.stderr.write(f"{file}: {error}")
+                    saved_entries += saved
+        except ImportRunning as e:
+            raise CommandError(str(e))
+        elapsed = max(time.perf_counter() - start, 1e-9)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"read {rows} rows and saved {saved_entries} entries in {elapsed:.2f}s: "
+                f"{rows / elapsed:.0f} rows/s, {size / 1e6 / elapsed:.2f} MB/s, "
+                f"peak RSS {peak_rss_mb():.0f} MB"
+            )
+        )
+        if failed:
+            raise CommandError(f"{failed} file(s) could not be imported")
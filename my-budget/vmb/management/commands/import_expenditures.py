@@ -0,0 +1,8 @@
+from ._import import ImportCommand
+
+
+class Command(ImportCommand):
+    help = "Imports oracle expenditure exports (tsv, UTF-16) without going through the web server"
+
+    kind = "expenditures"
+    root = "EXPENDITURE_ROOT"
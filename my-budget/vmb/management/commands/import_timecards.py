@@ -0,0 +1,8 @@
+from ._import import ImportCommand
+
+
+class Command(ImportCommand):
+    help = "Imports timecard exports (csv) without going through the web server"
+
+    kind = "timecards"
+    root = "TIMECARDS_ROOT"
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vmb.locks import ImportRunning, import_lock
+from vmb.models import Project
+from vmb.purge import purge_projects
+
+
+class Command(BaseCommand):
+    help = "Deletes projects with all their milestones, timecards, expenditures and rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("projects", nargs="*", type=int, help="oracle ids")
+        parser.add_argument(
+            "--group", action="append", type=int, default=[], help="id of a project group, all its projects are purged"
+        )
+
+    def handle(self, *args, **options):
+        project_ids = set(options["projects"])
+        if options["group"]:
+            project_ids.update(
+                Project.objects.filter(project_group__in=options["group"]).values_list("oracle_id", flat=True)
+            )
+        if not project_ids:
+            raise CommandError("no projects to purge, pass oracle ids or --group")
+
+        try:
+            with import_lock():
+                removed = purge_projects(sorted(project_ids))
+        except ImportRunning as e:
+            raise CommandError(str(e))
+
+        for name, rows in removed.items():
+            self.stdout.write(f"{rows} {name} removed")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vmb.locks import ImportRunning, import_lock
+from vmb.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the hours rollups from the timecards and expenditures"
+
+    def add_arguments(self, parser):
+        parser.add_argument("projects", nargs="*", type=int, help="oracle ids, all projects if omitted")
+
+    def handle(self, *args, **options):
+        try:
+            with import_lock():
+                rows = rebuild_rollups(options["projects"] or None)
+        except ImportRunning as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"{rows['timecards']} timecard weeks, {rows['expenditures']} expenditure weeks "
+            f"and {rows['months']} months rolled up"
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from vmb.watcher import DirectoryWatcher
+
+
+class Command(BaseCommand):
+    help = "Watches the upload folders and imports new timecard and expenditure exports"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=10, help="seconds between two scans")
+        parser.add_argument(
+            "--settle",
+            type=float,
+            default=30,
+            help="seconds a file must not have changed before it is imported",
+        )
+        parser.add_argument("--batch-size", type=int, default=20, help="files imported together")
+        parser.add_argument("--once", action="store_true", help="scan once and exit")
+
+    def handle(self, *args, **options):
+        watcher = DirectoryWatcher(settle=options["settle"], batch_size=options["batch_size"])
+        if options["once"]:
+            saved_entries = watcher.scan()
+            self.stdout.write(f"saved {saved_entries} entries")
+        else:
+            self.stdout.write("watching the upload folders, stop with CTRL-C")
+            watcher.run(interval=options["interval"])
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0007_project_group_alter_milestone_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('kind', models.CharField(choices=[('timecards', 'Timecards'), ('expenditures', 'Expenditures')], max_length=12)),
+                ('filename', models.CharField(max_length=255, verbose_name='Filename')),
+                ('size', models.BigIntegerField(verbose_name='Size [bytes]')),
+                ('rows', models.IntegerField(verbose_name='Rows')),
+                ('saved_entries', models.IntegerField(verbose_name='Saved Entries')),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
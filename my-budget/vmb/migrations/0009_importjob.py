@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0008_importedfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('timecards', 'Timecards'), ('expenditures', 'Expenditures')], max_length=12)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=7)),
+                ('filenames', models.TextField(blank=True, verbose_name='Filenames')),
+                ('files', models.IntegerField(default=0, verbose_name='Files')),
+                ('files_done', models.IntegerField(default=0, verbose_name='Files Done')),
+                ('rows_parsed', models.IntegerField(default=0, verbose_name='Rows Parsed')),
+                ('rows_inserted', models.IntegerField(default=0, verbose_name='Rows Inserted')),
+                ('rows_skipped', models.IntegerField(default=0, verbose_name='Rows Skipped')),
+                ('errors', models.TextField(blank=True, verbose_name='Errors')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('finished', models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0009_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importedfile',
+            name='state',
+            field=models.CharField(choices=[('importing', 'Importing'), ('imported', 'Imported')], default='imported', max_length=9),
+        ),
+    ]
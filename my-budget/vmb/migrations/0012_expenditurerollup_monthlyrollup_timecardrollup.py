@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0011_importlock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenditureRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=5, verbose_name='Task')),
+                ('week', models.DateField(verbose_name='Week')),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Quantity')),
+                ('entries', models.IntegerField(default=0, verbose_name='Entries')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='vmb.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'task', 'week'), name='unique_expenditure_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('timecards', 'Timecards'), ('expenditures', 'Expenditures')], max_length=12)),
+                ('month', models.DateField(verbose_name='Month')),
+                ('hours', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Hours')),
+                ('entries', models.IntegerField(default=0, verbose_name='Entries')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='vmb.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'kind', 'month'), name='unique_monthly_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TimecardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team', models.CharField(max_length=5, verbose_name='Team')),
+                ('week', models.DateField(verbose_name='Week')),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total Hours')),
+                ('entries', models.IntegerField(default=0, verbose_name='Entries')),
+                ('milestone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='vmb.milestone')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='vmb.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'milestone', 'team', 'week'), name='unique_timecard_rollup')],
+            },
+        ),
+    ]
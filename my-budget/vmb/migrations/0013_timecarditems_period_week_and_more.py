@@ -0,0 +1,64 @@
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth, TruncWeek
+
+
+def backfill_periods(apps, schema_editor):
+    TimecardItems = apps.get_model("vmb", "TimecardItems")
+    ExpenditureItem = apps.get_model("vmb", "ExpenditureItem")
+    TimecardItems.objects.update(
+        period_week=TruncWeek("start_date"), period_month=TruncMonth("start_date")
+    )
+    ExpenditureItem.objects.update(
+        period_week=TruncWeek("item_date"), period_month=TruncMonth("item_date")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0012_expenditurerollup_monthlyrollup_timecardrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timecarditems',
+            name='period_week',
+            field=models.DateField(null=True, verbose_name='Week'),
+        ),
+        migrations.AddField(
+            model_name='timecarditems',
+            name='period_month',
+            field=models.DateField(null=True, verbose_name='Month'),
+        ),
+        migrations.AddField(
+            model_name='expenditureitem',
+            name='period_week',
+            field=models.DateField(null=True, verbose_name='Week'),
+        ),
+        migrations.AddField(
+            model_name='expenditureitem',
+            name='period_month',
+            field=models.DateField(null=True, verbose_name='Month'),
+        ),
+        migrations.RunPython(backfill_periods, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='timecarditems',
+            name='period_week',
+            field=models.DateField(db_index=True, verbose_name='Week'),
+        ),
+        migrations.AlterField(
+            model_name='timecarditems',
+            name='period_month',
+            field=models.DateField(db_index=True, verbose_name='Month'),
+        ),
+        migrations.AlterField(
+            model_name='expenditureitem',
+            name='period_week',
+            field=models.DateField(db_index=True, verbose_name='Week'),
+        ),
+        migrations.AlterField(
+            model_name='expenditureitem',
+            name='period_month',
+            field=models.DateField(db_index=True, verbose_name='Month'),
+        ),
+    ]
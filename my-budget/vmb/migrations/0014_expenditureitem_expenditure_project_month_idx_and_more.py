@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0013_timecarditems_period_week_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expenditureitem',
+            index=models.Index(fields=['project', 'uom', 'period_month'], name='expenditure_project_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenditureitem',
+            index=models.Index(fields=['project', 'uom', 'item_date'], name='expenditure_project_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='milestone',
+            index=models.Index(fields=['project', 'task'], name='milestone_project_task_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timecarditems',
+            index=models.Index(fields=['project', 'period_month'], name='timecard_project_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timecarditems',
+            index=models.Index(fields=['project', 'start_date'], name='timecard_project_date_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def rebuild_timecard_rollups(apps, schema_editor):
+    TimecardItems = apps.get_model("vmb", "TimecardItems")
+    TimecardRollup = apps.get_model("vmb", "TimecardRollup")
+    TimecardRollup.objects.all().delete()
+    lines = (
+        TimecardItems.objects.values(
+            "project_id", "milestone_id", "team", week=F("period_week"), month=F("period_month")
+        )
+        .order_by()
+        .annotate(total_hours=Sum("total_hours"), entries=Count("pk"))
+    )
+    TimecardRollup.objects.bulk_create([TimecardRollup(**line) for line in lines], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0014_expenditureitem_expenditure_project_month_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='timecardrollup',
+            name='unique_timecard_rollup',
+        ),
+        migrations.AddField(
+            model_name='timecardrollup',
+            name='month',
+            field=models.DateField(null=True, verbose_name='Month'),
+        ),
+        migrations.RunPython(rebuild_timecard_rollups, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='timecardrollup',
+            name='month',
+            field=models.DateField(verbose_name='Month'),
+        ),
+        migrations.AddConstraint(
+            model_name='timecardrollup',
+            constraint=models.UniqueConstraint(fields=('project', 'milestone', 'team', 'week', 'month'), name='unique_timecard_rollup_month'),
+        ),
+    ]
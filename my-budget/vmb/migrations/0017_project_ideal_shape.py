@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0016_project_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='ideal_shape',
+            field=models.CharField(choices=[('linear', 'Linear'), ('front', 'Front-loaded'), ('s', 'S-curve'), ('milestones', 'Milestone-weighted')], default='linear', max_length=10, verbose_name='Ideal Burndown'),
+        ),
+    ]
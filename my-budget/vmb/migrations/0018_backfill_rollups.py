@@ -0,0 +1,61 @@
+from django.db import migrations
+from django.db.models import Count, F, Sum
+
+
+def rebuild_rollups(apps, schema_editor):
+    '''fills the rollups of databases that had timecards and expenditures before the rollups existed'''
+    TimecardItems = apps.get_model("vmb", "TimecardItems")
+    ExpenditureItem = apps.get_model("vmb", "ExpenditureItem")
+    TimecardRollup = apps.get_model("vmb", "TimecardRollup")
+    ExpenditureRollup = apps.get_model("vmb", "ExpenditureRollup")
+    MonthlyRollup = apps.get_model("vmb", "MonthlyRollup")
+
+    timecards = TimecardItems.objects.all()
+    expenditures = ExpenditureItem.objects.filter(uom="Hours")
+    for model in (TimecardRollup, ExpenditureRollup, MonthlyRollup):
+        model.objects.all().delete()
+
+    TimecardRollup.objects.bulk_create(
+        [
+            TimecardRollup(**line)
+            for line in timecards.values(
+                "project_id", "milestone_id", "team", week=F("period_week"), month=F("period_month")
+            )
+            .order_by()
+            .annotate(total_hours=Sum("total_hours"), entries=Count("pk"))
+        ],
+        batch_size=1000,
+    )
+    ExpenditureRollup.objects.bulk_create(
+        [
+            ExpenditureRollup(**line)
+            for line in expenditures.values("project_id", "task", week=F("period_week"))
+            .order_by()
+            .annotate(quantity=Sum("quantity"), entries=Count("pk"))
+        ],
+        batch_size=1000,
+    )
+    MonthlyRollup.objects.bulk_create(
+        [
+            MonthlyRollup(kind=kind, **line)
+            for kind, items, hours_field in (
+                ("timecards", timecards, "total_hours"),
+                ("expenditures", expenditures, "quantity"),
+            )
+            for line in items.values("project_id", month=F("period_month"))
+            .order_by()
+            .annotate(hours=Sum(hours_field), entries=Count("pk"))
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0017_project_ideal_shape'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:23
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0018_backfill_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='expenditureitem',
+            name='expenditure_project_month_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='timecarditems',
+            name='timecard_project_month_idx',
+        ),
+    ]
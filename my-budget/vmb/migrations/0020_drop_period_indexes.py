@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmb', '0019_drop_month_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expenditureitem',
+            name='period_month',
+            field=models.DateField(verbose_name='Month'),
+        ),
+        migrations.AlterField(
+            model_name='expenditureitem',
+            name='period_week',
+            field=models.DateField(verbose_name='Week'),
+        ),
+        migrations.AlterField(
+            model_name='timecarditems',
+            name='period_month',
+            field=models.DateField(verbose_name='Month'),
+        ),
+        migrations.AlterField(
+            model_name='timecarditems',
+            name='period_week',
+            field=models.DateField(verbose_name='Week'),
+        ),
+    ]
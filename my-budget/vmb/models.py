@@ -1,10 +1,9 @@
 from django.db import models
 from django.conf import settings
-import pandas as pd
-import decimal
 import os
 
-from .tools import diff_month, diff_weeks
+from .ideal import IDEAL_SHAPES, ideal_burndown
+from .tools import diff_month, diff_weeks, month_of, week_of
 
 PROJECT_TYPES = (
     ("tandm", "T&M"),
@@ -26,6 +25,23 @@ TASK_TYPES = (
     ("fpe", "Fixed Price Engagement")
 )
 
+IMPORT_KINDS = (
+    ("timecards", "Timecards"),
+    ("expenditures", "Expenditures"),
+)
+
+IMPORTED_FILE_STATES = (
+    ("importing", "Importing"),
+    ("imported", "Imported"),
+)
+
+IMPORT_JOB_STATES = (
+    ("queued", "Queued"),
+    ("running", "Running"),
+    ("done", "Done"),
+    ("failed", "Failed"),
+)
+
 class Project_Group(models.Model):
     id = models.BigAutoField("ID", unique=True, null=False, primary_key=True)
     name = models.CharField("Name", max_length=200)
@@ -47,6 +63,9 @@ class Project(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
     type = models.CharField(max_length=6, choices=PROJECT_TYPES, default="tandm")
+    ideal_shape = models.CharField("Ideal Burndown", max_length=10, choices=IDEAL_SHAPES, default="linear")
+    # bumped whenever the hours or the details of the project change, keys the chart cache
+    data_version = models.PositiveIntegerField(default=0, editable=False)
 
     project_group = models.ForeignKey(Project_Group, blank=True, null=True, on_delete=models.SET_NULL)
 
@@ -59,36 +78,25 @@ class Project(models.Model):
     def ideal_burn_by_month(self):
         return self.sold_hours / self.runtime_in_month()
 
-    def ideal_burndown_by_month(self):
-        sold_hours = self.sold_hours
-        runtime = self.runtime_in_month()
-        burn_by_month = sold_hours / runtime
-        remaining_hours = sold_hours
-        start_date = self.start_date
-        months = []
-        hours_left = []
-        for i in range(runtime):
-            months.append(pd.to_datetime(start_date) + pd.DateOffset(months=i))
-            remaining_hours = remaining_hours - burn_by_month
-            hours_left.append(remaining_hours)
-
-        return months, hours_left
-
-    def ideal_burndown_by_weeks(self):
-        sold_hours = self.sold_hours
-        runtime = self.runtime_in_weeks()
-        burn_by_week = sold_hours / decimal.Decimal(runtime)
-        remaining_hours = sold_hours
-        start_date = self.start_date
-        weeks = []
-        hours_left = []
-        runtime_as_int = int(runtime)
-        for i in range(runtime_as_int):
-            weeks.append(pd.to_datetime(start_date) + pd.DateOffset(weeks=i))
-            remaining_hours = remaining_hours - burn_by_week
-            hours_left.append(remaining_hours)
-
-        return weeks, hours_left
+    def ideal_weights(self, shape: str = None) -> tuple:
+        '''the sold hours of the milestones in task order, only needed for milestone-weighted burndowns'''
+        if (shape or self.ideal_shape) != "milestones":
+            return ()
+        sold_hours = self.milestone_set.order_by("task", "id").values_list("sold_hours", flat=True)
+        return tuple(float(hours) for hours in sold_hours)
+
+    def ideal_burndown(self, timeframe: str = "week", shape: str = None):
+        '''the first days of the periods and the ideal hours left at their end, as arrays'''
+        shape = shape or self.ideal_shape
+        return ideal_burndown(
+            float(self.sold_hours), self.start_date, self.end_date, timeframe, shape, self.ideal_weights(shape)
+        )
+
+    def ideal_burndown_by_month(self, shape: str = None):
+        return self.ideal_burndown("month", shape)
+
+    def ideal_burndown_by_weeks(self, shape: str = None):
+        return self.ideal_burndown("week", shape)
 
     class Meta:
         ordering = ["name"]
@@ -110,6 +118,11 @@ class Milestone(models.Model):
     def __str__(self):
         return (f"{self.id}, {self.task}, {self.get_name_display()}")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["project", "task"], name="milestone_project_task_idx"),
+        ]
+
 
 class TimecardItems(models.Model):
     timecard_id = models.CharField(max_length=28, primary_key=True)
@@ -123,6 +136,19 @@ class TimecardItems(models.Model):
     deliver_location = models.CharField("Delivery Location", max_length=25)
     team = models.CharField("Team", max_length=5)
     notes = models.CharField("Notes", max_length=512)
+    # monday of the week and first of the month of start_date, set on save and import
+    period_week = models.DateField("Week")
+    period_month = models.DateField("Month")
+
+    def save(self, *args, **kwargs):
+        self.period_week = week_of(self.start_date)
+        self.period_month = month_of(self.start_date)
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project", "start_date"], name="timecard_project_date_idx"),
+        ]
 
 
 class ExpenditureItem(models.Model):
@@ -147,6 +173,19 @@ class ExpenditureItem(models.Model):
     )
     bill_amount = models.DecimalField("Bill Amount", decimal_places=2, max_digits=12)
     comment = models.CharField("Comment", max_length=255, null=True)
+    # monday of the week and first of the month of item_date, set on save and import
+    period_week = models.DateField("Week")
+    period_month = models.DateField("Month")
+
+    def save(self, *args, **kwargs):
+        self.period_week = week_of(self.item_date)
+        self.period_month = month_of(self.item_date)
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project", "uom", "item_date"], name="expenditure_project_date_idx"),
+        ]
 
 
 class ExpenditureDocument(models.Model):
@@ -163,3 +202,125 @@ class TimecardDocument(models.Model):
 
     def filename(self):
         return os.path.basename(self.document.name)
+
+
+class ImportedFile(models.Model):
+    """
+    manifest of the files that have been imported, identified by their
+    content. A file is claimed (state importing) before it is imported,
+    so several processes never import the same content twice.
+    """
+    sha256 = models.CharField("SHA-256", max_length=64, unique=True)
+    kind = models.CharField(max_length=12, choices=IMPORT_KINDS)
+    state = models.CharField(max_length=9, choices=IMPORTED_FILE_STATES, default="imported")
+    filename = models.CharField("Filename", max_length=255)
+    size = models.BigIntegerField("Size [bytes]")
+    rows = models.IntegerField("Rows")
+    saved_entries = models.IntegerField("Saved Entries")
+    imported_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return (f"{self.filename} ({self.kind}, {self.imported_at})")
+
+
+class ImportJob(models.Model):
+    """an import of a list of files running in the background"""
+    kind = models.CharField(max_length=12, choices=IMPORT_KINDS)
+    status = models.CharField(max_length=7, choices=IMPORT_JOB_STATES, default="queued")
+    filenames = models.TextField("Filenames", blank=True)
+    files = models.IntegerField("Files", default=0)
+    files_done = models.IntegerField("Files Done", default=0)
+    rows_parsed = models.IntegerField("Rows Parsed", default=0)
+    rows_inserted = models.IntegerField("Rows Inserted", default=0)
+    rows_skipped = models.IntegerField("Rows Skipped", default=0)
+    errors = models.TextField("Errors", blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True)
+
+    def get_filenames(self):
+        return [filename for filename in self.filenames.splitlines() if filename]
+
+    def is_finished(self):
+        return self.status in ("done", "failed")
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "files": self.files,
+            "files_done": self.files_done,
+            "rows_parsed": self.rows_parsed,
+            "rows_inserted": self.rows_inserted,
+            "rows_skipped": self.rows_skipped,
+            "errors": self.errors.splitlines(),
+            "finished": self.is_finished(),
+        }
+
+    def __str__(self):
+        return (f"{self.id}, {self.kind}, {self.get_status_display()}")
+
+
+class ImportLock(models.Model):
+    """
+    advisory lock, a row exists while an import is writing to the database,
+    shared by all processes using the database
+    """
+    name = models.CharField(max_length=32, primary_key=True)
+    owner = models.CharField(max_length=255)
+    acquired_at = models.DateTimeField()
+
+    def __str__(self):
+        return (f"{self.name} held by {self.owner} since {self.acquired_at}")
+
+
+class TimecardRollup(models.Model):
+    """
+    hours of the timecards summed up by project, milestone, team and week,
+    the week is the monday it starts with. Weeks spanning two months are
+    split by month, so months can be summed up from the same rows.
+    Maintained by the importer and the edit views, rebuild_rollups
+    recomputes it from the timecards.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    milestone = models.ForeignKey(Milestone, on_delete=models.CASCADE)
+    team = models.CharField("Team", max_length=5)
+    week = models.DateField("Week")
+    month = models.DateField("Month")
+    total_hours = models.DecimalField("Total Hours", decimal_places=2, max_digits=12, default=0)
+    entries = models.IntegerField("Entries", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["project", "milestone", "team", "week", "month"], name="unique_timecard_rollup_month"
+            )
+        ]
+
+
+class ExpenditureRollup(models.Model):
+    """hours of the expenditures (UOM Hours) summed up by project, task and week"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    task = models.CharField("Task", max_length=5)
+    week = models.DateField("Week")
+    quantity = models.DecimalField("Quantity", decimal_places=2, max_digits=12, default=0)
+    entries = models.IntegerField("Entries", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["project", "task", "week"], name="unique_expenditure_rollup")
+        ]
+
+
+class MonthlyRollup(models.Model):
+    """hours of the timecards or expenditures summed up by project and month"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=12, choices=IMPORT_KINDS)
+    month = models.DateField("Month")
+    hours = models.DecimalField("Hours", decimal_places=2, max_digits=12, default=0)
+    entries = models.IntegerField("Entries", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["project", "kind", "month"], name="unique_monthly_rollup")
+        ]
@@ -0,0 +1,73 @@
+from django.db import connection, transaction
+from logging import getLogger
+
+from .importer import KEY_BATCH_SIZE
+from .models import (
+    ExpenditureItem,
+    ExpenditureRollup,
+    ImportedFile,
+    Milestone,
+    MonthlyRollup,
+    Project,
+    TimecardItems,
+    TimecardRollup,
+)
+
+
+logger = getLogger(__name__)
+
+# children first, the rows referencing milestones before the milestones
+PURGE_ORDER = [
+    TimecardRollup,
+    TimecardItems,
+    ExpenditureRollup,
+    ExpenditureItem,
+    MonthlyRollup,
+    Milestone,
+    Project,
+]
+
+
+def _delete(model, column: str, project_ids: list) -> int:
+    """
+    DELETE ... WHERE column IN (...) for the rows of model, one statement by
+    KEY_BATCH_SIZE projects, returns the rows removed
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(column)
+    removed = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(project_ids), KEY_BATCH_SIZE):
+            batch = project_ids[start : start + KEY_BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", batch)
+            removed += cursor.rowcount
+    return removed
+
+
+def purge_projects(project_ids) -> dict:
+    """
+    deletes projects with all their milestones, timecards, expenditures and
+    rollups in one transaction. Unlike project.delete() the rows are not
+    loaded to cascade, every table is emptied with set-based DELETEs.
+
+    The manifest does not know which projects a file holds, so all imported
+    files are dropped from it and an export can be imported again after
+    its projects were purged, rows still stored are skipped as usual.
+    Returns the number of rows removed by model name.
+    """
+    project_ids = list(project_ids)
+    removed = {model.__name__: 0 for model in PURGE_ORDER}
+    removed[ImportedFile.__name__] = 0
+    if not project_ids:
+        return removed
+
+    with transaction.atomic():
+        for model in PURGE_ORDER:
+            column = model._meta.pk.column if model is Project else model._meta.get_field("project").column
+            removed[model.__name__] = _delete(model, column, project_ids)
+        removed[ImportedFile.__name__] = ImportedFile.objects.filter(state="imported").delete()[0]
+
+    logger.info(f"purged projects {project_ids}: {removed}")
+    return removed
+
@@ -0,0 +1,164 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from logging import getLogger
+
+import pandas as pd
+
+from .models import ExpenditureItem, ExpenditureRollup, MonthlyRollup, Project, TimecardItems, TimecardRollup
+
+
+logger = getLogger(__name__)
+
+
+def _apply(model, keys: list, hours_field: str, sums: pd.DataFrame, sign: int = 1, **fixed):
+    """
+    adds the grouped sums (index keys, columns hours and entries) to the
+    rollup rows of model, missing rows are created and rows without
+    entries left are removed
+    """
+    if sums.empty:
+        return
+
+    sums = sums.reset_index()
+    rows = model.objects.filter(
+        project_id__in=sums["project_id"].unique().tolist(),
+        **{f"{keys[-1]}__gte": sums[keys[-1]].min(), f"{keys[-1]}__lte": sums[keys[-1]].max()},
+        **fixed,
+    )
+    existing = {tuple(getattr(row, key) for key in keys): row for row in rows}
+
+    changed = []
+    created = []
+    for values in zip(*(sums[column].tolist() for column in [*keys, "hours", "entries"])):
+        key = values[:-2]
+        hours = sign * Decimal(f"{values[-2]:.2f}")
+        entries = sign * values[-1]
+        row = existing.get(key)
+        if row is None:
+            if sign < 0:
+                logger.warning("%s %s is missing, run rebuild_rollups", model.__name__, key)
+                continue
+            created.append(model(**dict(zip(keys, key)), **fixed, **{hours_field: hours}, entries=entries))
+        else:
+            setattr(row, hours_field, getattr(row, hours_field) + hours)
+            row.entries += entries
+            changed.append(row)
+
+    batch_size = settings.IMPORT_BATCH_SIZE
+    model.objects.bulk_create(created, batch_size=batch_size)
+    model.objects.bulk_update(changed, [hours_field, "entries"], batch_size=batch_size)
+    empty = [row.pk for row in changed if row.entries <= 0]
+    if empty:
+        model.objects.filter(pk__in=empty).delete()
+
+
+def bump_data_version(project_ids):
+    '''marks the cached charts of the projects as outdated'''
+    Project.objects.filter(pk__in=list(project_ids)).update(data_version=F("data_version") + 1)
+
+
+def _grouped(frame: pd.DataFrame, keys: list, hours_column: str) -> pd.DataFrame:
+    return frame.groupby(keys, sort=False)[hours_column].agg(hours="sum", entries="count")
+
+
+def add_timecards(frame: pd.DataFrame, sign: int = 1):
+    """
+    adds timecards to the rollups, the frame needs the columns project_id,
+    milestone_id, team, period_week, period_month and total_hours. With
+    sign -1 the timecards are taken out again.
+    """
+    if frame.empty:
+        return
+    frame = frame.rename(columns={"period_week": "week", "period_month": "month"}).assign(
+        total_hours=frame["total_hours"].astype("float64"),
+    )
+    keys = ["project_id", "milestone_id", "team", "week", "month"]
+    _apply(TimecardRollup, keys, "total_hours", _grouped(frame, keys, "total_hours"), sign)
+    keys = ["project_id", "month"]
+    _apply(MonthlyRollup, keys, "hours", _grouped(frame, keys, "total_hours"), sign, kind="timecards")
+    bump_data_version(frame["project_id"].unique().tolist())
+
+
+def add_expenditures(frame: pd.DataFrame, sign: int = 1):
+    """
+    adds expenditures to the rollups, the frame needs the columns
+    project_id, task, period_week, period_month, quantity and uom, only
+    hours are counted
+    """
+    frame = frame[frame["uom"] == "Hours"]
+    if frame.empty:
+        return
+    frame = frame.rename(columns={"period_week": "week", "period_month": "month"}).assign(
+        quantity=frame["quantity"].astype("float64"),
+    )
+    keys = ["project_id", "task", "week"]
+    _apply(ExpenditureRollup, keys, "quantity", _grouped(frame, keys, "quantity"), sign)
+    keys = ["project_id", "month"]
+    _apply(MonthlyRollup, keys, "hours", _grouped(frame, keys, "quantity"), sign, kind="expenditures")
+    bump_data_version(frame["project_id"].unique().tolist())
+
+
+def timecards_frame(timecards) -> pd.DataFrame:
+    '''the rollup columns of a few TimecardItems'''
+    columns = ["project_id", "milestone_id", "team", "period_week", "period_month", "total_hours"]
+    return pd.DataFrame(
+        [[getattr(timecard, column) for column in columns] for timecard in timecards],
+        columns=columns,
+    )
+
+
+def rebuild_rollups(project_ids=None) -> dict:
+    """
+    recomputes all rollups from the timecards and expenditures, or only
+    those of the given projects, returns the number of rows by rollup
+    """
+    timecards = TimecardItems.objects.all()
+    expenditures = ExpenditureItem.objects.filter(uom="Hours")
+    rollups = [TimecardRollup, ExpenditureRollup, MonthlyRollup]
+    if project_ids is not None:
+        timecards = timecards.filter(project__in=project_ids)
+        expenditures = expenditures.filter(project__in=project_ids)
+        stored = [model.objects.filter(project__in=project_ids) for model in rollups]
+    else:
+        stored = [model.objects.all() for model in rollups]
+
+    timecard_rows = [
+        TimecardRollup(**line)
+        for line in timecards.values(
+            "project_id", "milestone_id", "team", week=F("period_week"), month=F("period_month")
+        )
+        .order_by()
+        .annotate(total_hours=Sum("total_hours"), entries=Count("pk"))
+    ]
+    expenditure_rows = [
+        ExpenditureRollup(**line)
+        for line in expenditures.values("project_id", "task", week=F("period_week"))
+        .order_by()
+        .annotate(quantity=Sum("quantity"), entries=Count("pk"))
+    ]
+    monthly_rows = [
+        MonthlyRollup(kind=kind, **line)
+        for kind, items, hours_field in (
+            ("timecards", timecards, "total_hours"),
+            ("expenditures", expenditures, "quantity"),
+        )
+        for line in items.values("project_id", month=F("period_month"))
+        .order_by()
+        .annotate(hours=Sum(hours_field), entries=Count("pk"))
+    ]
+
+    batch_size = settings.IMPORT_BATCH_SIZE
+    with transaction.atomic():
+        for rows in stored:
+            rows.delete()
+        TimecardRollup.objects.bulk_create(timecard_rows, batch_size=batch_size)
+        ExpenditureRollup.objects.bulk_create(expenditure_rows, batch_size=batch_size)
+        MonthlyRollup.objects.bulk_create(monthly_rows, batch_size=batch_size)
+
+    return {
+        "timecards": len(timecard_rows),
+        "expenditures": len(expenditure_rows),
+        "months": len(monthly_rows),
+    }
@@ -0,0 +1,215 @@
+/*
+ * draws the chart series served by /vmb/chart_series/ as svg in the browser.
+ *
+ * <div data-chart-series="/vmb/chart_series/project/12/timecards?timeframe=week"
+ *      data-chart-type="burndown"></div>
+ *
+ * data-chart-type is "burndown" (ideal and actual remaining hours with the
+ * burned hours as bars) or "bars" (burned hours only).
+ */
+(function () {
+  "use strict";
+
+  const NS = "http://www.w3.org/2000/svg";
+  const WIDTH = 700;
+  const HEIGHT = 400;
+  const MARGIN = { top: 30, right: 60, bottom: 50, left: 60 };
+  const DAY = 24 * 60 * 60 * 1000;
+  const MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"];
+
+  function node(name, attributes, parent, text) {
+    const element = document.createElementNS(NS, name);
+    for (const [key, value] of Object.entries(attributes || {})) {
+      element.setAttribute(key, value);
+    }
+    if (text !== undefined) {
+      element.textContent = text;
+    }
+    if (parent) {
+      parent.appendChild(element);
+    }
+    return element;
+  }
+
+  function time(day) {
+    return Date.parse(day + "T00:00:00Z");
+  }
+
+  function linear(domain, range) {
+    const span = domain[1] - domain[0] || 1;
+    return (value) => range[0] + ((value - domain[0]) / span) * (range[1] - range[0]);
+  }
+
+  function niceLimit(value) {
+    if (value <= 0) {
+      return 0;
+    }
+    const step = Math.pow(10, Math.floor(Math.log10(value)));
+    for (const factor of [1, 2, 2.5, 5, 10]) {
+      if (factor * step >= value) {
+        return factor * step;
+      }
+    }
+    return 10 * step;
+  }
+
+  function yTicks(low, high) {
+    const step = (high - low) / 5 || 1;
+    return Array.from({ length: 6 }, (_, i) => low + i * step);
+  }
+
+  function monthTicks(first, last) {
+    const ticks = [];
+    const start = new Date(first);
+    let year = start.getUTCFullYear();
+    let month = start.getUTCMonth();
+    for (;;) {
+      const tick = Date.UTC(year, month, 1);
+      if (tick > last) {
+        break;
+      }
+      if (tick >= first) {
+        ticks.push(tick);
+      }
+      month += 1;
+      if (month === 12) {
+        month = 0;
+        year += 1;
+      }
+    }
+    const every = Math.ceil(ticks.length / 12) || 1;
+    return ticks.filter((_, i) => i % every === 0);
+  }
+
+  function frame(container, title, xDomain) {
+    container.replaceChildren();
+    const svg = node("svg", {
+      viewBox: `0 0 ${WIDTH} ${HEIGHT}`,
+      width: "100%",
+      role: "img",
+      "aria-label": title,
+      "font-family": "sans-serif",
+      "font-size": "11",
+    }, container);
+    node("text", { x: WIDTH / 2, y: 18, "text-anchor": "middle", "font-size": "13" }, svg, title);
+
+    const x = linear(xDomain, [MARGIN.left, WIDTH - MARGIN.right]);
+    const bottom = HEIGHT - MARGIN.bottom;
+    node("line", { x1: MARGIN.left, x2: WIDTH - MARGIN.right, y1: bottom, y2: bottom, stroke: "#333" }, svg);
+    for (const tick of monthTicks(xDomain[0], xDomain[1])) {
+      const day = new Date(tick);
+      const label = `${MONTHS[day.getUTCMonth()]} ${day.getUTCFullYear()}`;
+      node("line", { x1: x(tick), x2: x(tick), y1: bottom, y2: bottom + 4, stroke: "#333" }, svg);
+      node("text", {
+        x: x(tick), y: bottom + 14, "text-anchor": "end", transform: `rotate(-20 ${x(tick)} ${bottom + 14})`,
+      }, svg, label);
+    }
+    return { svg, x };
+  }
+
+  function yAxis(svg, domain, side, label) {
+    const y = linear(domain, [HEIGHT - MARGIN.bottom, MARGIN.top]);
+    const left = side === "left";
+    const position = left ? MARGIN.left : WIDTH - MARGIN.right;
+    node("line", { x1: position, x2: position, y1: MARGIN.top, y2: HEIGHT - MARGIN.bottom, stroke: "#333" }, svg);
+    for (const tick of yTicks(domain[0], domain[1])) {
+      node("text", {
+        x: position + (left ? -6 : 6), y: y(tick) + 4, "text-anchor": left ? "end" : "start",
+      }, svg, Math.round(tick).toLocaleString());
+    }
+    const middle = (MARGIN.top + HEIGHT - MARGIN.bottom) / 2;
+    const offset = left ? 14 : WIDTH - 8;
+    node("text", {
+      x: offset, y: middle, "text-anchor": "middle", transform: `rotate(-90 ${offset} ${middle})`,
+    }, svg, label);
+    return y;
+  }
+
+  function barRects(svg, x, y, periods, values, days, attributes) {
+    const width = Math.max(1, x(days * DAY) - x(0));
+    periods.forEach((period, i) => {
+      const top = y(Math.max(values[i], 0));
+      node("rect", {
+        x: x(time(period)) - width / 2, y: top, width: width, height: Math.max(0, y(0) - top), ...attributes,
+      }, svg);
+    });
+  }
+
+  function legend(svg, entries) {
+    entries.forEach(([label, attributes], i) => {
+      const top = MARGIN.top + 6 + i * 16;
+      const left = WIDTH - MARGIN.right - 90;
+      node("line", { x1: left, x2: left + 20, y1: top, y2: top, "stroke-width": 2, ...attributes }, svg);
+      node("text", { x: left + 26, y: top + 4 }, svg, label);
+    });
+  }
+
+  function domainOf(days) {
+    const times = days.map(time);
+    if (!times.length) {
+      const now = Date.now();
+      return [now - 30 * DAY, now];
+    }
+    return [Math.min(...times) - 7 * DAY, Math.max(...times) + 7 * DAY];
+  }
+
+  function burndown(container, series) {
+    const ideal = series.ideal || { periods: [], remaining: [] };
+    const { svg, x } = frame(container, series.title, domainOf(series.periods.concat(ideal.periods)));
+
+    const remaining = series.remaining.concat(ideal.remaining);
+    const low = Math.min(0, ...remaining);
+    const y = yAxis(svg, [low, niceLimit(Math.max(1, ...remaining))], "left", "Remaining hours");
+    const y2 = yAxis(svg, [0, niceLimit(Math.max(1, ...series.burned))], "right", `Burned hours by ${series.timeframe}`);
+
+    barRects(svg, x, y2, series.periods, series.burned, series.timeframe === "week" ? 6 : 20, {
+      fill: "orange", "fill-opacity": 0.25,
+    });
+
+    if (ideal.periods.length) {
+      const points = ideal.periods.map((period, i) => `${x(time(period))},${y(ideal.remaining[i])}`);
+      node("polyline", {
+        points: points.join(" "), fill: "none", stroke: "green", "stroke-width": 1.5, "stroke-dasharray": "6 4",
+      }, svg);
+    }
+
+    if (series.periods.length) {
+      let path = `M${x(time(series.periods[0]))},${y(series.remaining[0])}`;
+      for (let i = 1; i < series.periods.length; i++) {
+        path += ` H${x(time(series.periods[i]))} V${y(series.remaining[i])}`;
+      }
+      node("path", { d: path, fill: "none", stroke: "#1f77b4", "stroke-width": 1.5 }, svg);
+    }
+
+    legend(svg, [["Ideal", { stroke: "green", "stroke-dasharray": "6 4" }], ["Actual", { stroke: "#1f77b4" }]]);
+  }
+
+  function bars(container, series) {
+    const { svg, x } = frame(container, series.title, domainOf(series.periods));
+    const y = yAxis(svg, [0, niceLimit(Math.max(1, ...series.burned))], "left", `Burned hours by ${series.timeframe}`);
+    barRects(svg, x, y, series.periods, series.burned, 9, { fill: "red" });
+  }
+
+  const TYPES = { burndown, bars };
+
+  function draw(container) {
+    const type = TYPES[container.dataset.chartType || "burndown"];
+    return fetch(container.dataset.chartSeries, { headers: { Accept: "application/json" } })
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(`${response.status} ${response.statusText}`);
+        }
+        return response.json();
+      })
+      .then((series) => type(container, series))
+      .catch((error) => {
+        container.textContent = `The chart could not be loaded: ${error.message}`;
+      });
+  }
+
+  document.addEventListener("DOMContentLoaded", () => {
+    document.querySelectorAll("[data-chart-series]").forEach(draw);
+  });
+
+  window.vmbCharts = { burndown, bars, draw };
+})();
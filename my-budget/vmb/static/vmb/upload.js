@@ -0,0 +1,41 @@
+/*
+ * submits the streaming upload form with fetch, so the CSRF token travels in
+ * the X-CSRFToken header and the server can check it before reading the file.
+ *
+ * <form data-stream-upload data-csrf-token="..." data-done="/vmb/documents">
+ *
+ * data-done is the page shown once the file has been imported.
+ */
+(function () {
+  "use strict";
+
+  function submit(event) {
+    event.preventDefault();
+    const form = event.target;
+    const keep = form.querySelector("#keep").checked ? "1" : "0";
+    const status = form.querySelector("[data-upload-status]");
+    status.textContent = "Uploading and importing the file ...";
+
+    // the redirect is not followed, the messages of the import are shown on data-done
+    fetch(`?keep=${keep}`, {
+      method: "POST",
+      body: new FormData(form),
+      headers: { "X-CSRFToken": form.dataset.csrfToken },
+      credentials: "same-origin",
+      redirect: "manual",
+    })
+      .then((response) => {
+        if (response.type !== "opaqueredirect" && !response.ok) {
+          throw new Error(`${response.status} ${response.statusText}`);
+        }
+        window.location.assign(form.dataset.done);
+      })
+      .catch((error) => {
+        status.textContent = `The file could not be uploaded: ${error.message}`;
+      });
+  }
+
+  document.addEventListener("DOMContentLoaded", () => {
+    document.querySelectorAll("form[data-stream-upload]").forEach((form) => form.addEventListener("submit", submit));
+  });
+})();
@@ -1,16 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from django.apps import apps
 from django.conf import settings
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from importlib import import_module
+from io import StringIO
 from logging import getLogger
+from queue import Queue
+from unittest.mock import patch
 
-from .models import Project, ExpenditureDocument, TimecardDocument
+from . import views
+from .analytics import GroupAnalytics, ProjectAnalytics
+from .chartcache import cached_chart, clear, evict, group_data_version
+from .charts import bar_chart, burndown_chart, render
+from .purge import PURGE_ORDER, purge_projects
+from .ideal import ideal_burndown
+from .helper import calculate_hours_by_team_and_milestone, expenditure_milestone_rollup
+from .importer import KEY_BATCH_SIZE, _QueuedChunks, _parse_into, claim_file, existing_keys, file_digest, import_file, import_files, parse_file, write_timecards
+from .rollups import rebuild_rollups
+from .tools import date_range, period_window
+from .locks import ImportRunning, import_lock, is_import_running
+from .watcher import DirectoryWatcher
+from .uploadhandlers import StreamingImportUploadHandler, split_complete_records
+from .models import Project, Project_Group, Milestone, ExpenditureItem, ExpenditureRollup, MonthlyRollup, TimecardRollup, ImportedFile, ImportJob, ImportLock, ExpenditureDocument, TimecardDocument, TimecardItems
 
+import gzip
 import os
+import pandas as pd
+import shutil
+import tempfile
 
 
 logger = getLogger(__name__)
 
 
+@override_settings(IMPORT_JOBS_ASYNC=False)
 class Delete_Project(TestCase):
 
     def setUp(self):
@@ -76,6 +108,7 @@ class Delete_TSV(TestCase):
         cleaning_up(self)
 
 
+@override_settings(IMPORT_JOBS_ASYNC=False)
 class Import_TSV(TestCase):
 
     def setUp(self):
@@ -86,12 +119,1067 @@ class Import_TSV(TestCase):
         client = Client()
         response = client.get(reverse("read-expenditures"))
         self.assertEqual(response.status_code, 302)
-        self.assertEqual(response["location"], "/vmb/")
+
+        job = ImportJob.objects.get()
+        self.assertEqual(response["location"], f"/vmb/import_job/{job.id}")
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.rows_inserted, 256)
 
         project = Project.objects.filter(pk=12).first()
         self.assertIsNotNone(project)
         self.assertEqual(project.expenditureitem_set.count(), 256)
 
+        item = ExpenditureItem.objects.get(pk=34819589)
+        self.assertEqual(item.expnd_type, "labor")
+        self.assertEqual(item.item_date.isoformat(), "2020-07-01")
+        self.assertIsNone(item.comment)
+
+    def test_read_twice(self):
+        """Check if already imported expenditures are skipped"""
+        client = Client()
+        client.get(reverse("read-expenditures"))
+        client.get(reverse("read-expenditures"))
+
+        self.assertEqual(ExpenditureItem.objects.count(), 256)
+
+    def test_job_status(self):
+        """Check if the progress of an import job can be polled"""
+        client = Client()
+        client.get(reverse("read-expenditures"))
+        job = ImportJob.objects.get()
+
+        response = client.get(reverse("import-job-status", kwargs={"job_id": job.id}))
+        self.assertEqual(response.status_code, 200)
+        status = response.json()
+        self.assertTrue(status["finished"])
+        self.assertEqual(status["files_done"], 1)
+        self.assertEqual(status["rows_parsed"], 256)
+        self.assertEqual(status["rows_skipped"], 0)
+
+        response = client.get(reverse("import-job", kwargs={"job_id": job.id}))
+        self.assertEqual(response.status_code, 200)
+
+    def test_import_command(self):
+        """Check if tsv files can be imported from the command line"""
+        output = StringIO()
+        call_command(
+            "import_expenditures",
+            os.path.join(settings.EXPENDITURE_ROOT, "*.tsv"),
+            "--batch-size=50",
+            "--transaction=file",
+            stdout=output,
+        )
+        self.assertEqual(ExpenditureItem.objects.count(), 256)
+        self.assertIn("saved 256 entries", output.getvalue())
+        self.assertIn("rows/s", output.getvalue())
+
+    def test_read_in_chunks(self):
+        """Check if a file read in small chunks is imported completely"""
+        saved_entries = import_file(
+            os.path.join(settings.EXPENDITURE_ROOT, "test.tsv"), "expenditures", chunk_size=10
+        )
+        self.assertEqual(saved_entries, 256)
+        self.assertEqual(ExpenditureItem.objects.count(), 256)
+
+    def test_skip_imported_file(self):
+        """Check if a file that has been imported before is not parsed again"""
+        abs_file_path = os.path.join(settings.EXPENDITURE_ROOT, "test.tsv")
+        self.assertEqual(import_file(abs_file_path, "expenditures"), 256)
+
+        imported_file = ImportedFile.objects.get()
+        self.assertEqual(imported_file.kind, "expenditures")
+        self.assertEqual(imported_file.rows, 256)
+        self.assertEqual(imported_file.size, os.path.getsize(abs_file_path))
+
+        ExpenditureItem.objects.all().delete()
+        self.assertEqual(import_file(abs_file_path, "expenditures"), 0)
+        self.assertEqual(import_file(abs_file_path, "expenditures", force=True), 256)
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Import_CSV(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+
+    def test_read(self):
+        """Check if csv files can be read"""
+        client = Client()
+        response = client.get(reverse("read-timecards"))
+        self.assertEqual(response.status_code, 302)
+
+        job = ImportJob.objects.get()
+        self.assertEqual(response["location"], f"/vmb/import_job/{job.id}")
+
+        self.assertEqual(TimecardItems.objects.count(), 48)
+        self.assertEqual(Project.objects.count(), 2)
+        self.assertEqual(Milestone.objects.filter(project_id=12).count(), 3)
+        self.assertEqual(Milestone.objects.get(project_id=13, task="1").name, "el")
+
+        timecard = TimecardItems.objects.get(pk="TC000001")
+        self.assertEqual(timecard.notes, "T01 friday update")
+        self.assertEqual(timecard.team, "T01")
+        self.assertEqual(TimecardItems.objects.get(pk="TC000033").team, "T00")
+        self.assertEqual(TimecardItems.objects.get(pk="TC000048").notes, "")
+
+    def test_read_twice(self):
+        """Check if already imported timecards are skipped"""
+        client = Client()
+        client.get(reverse("read-timecards"))
+        client.get(reverse("read-timecards"))
+
+        self.assertEqual(TimecardItems.objects.count(), 48)
+        self.assertEqual(Milestone.objects.count(), 5)
+
+    def test_existing_keys(self):
+        """Check if only the keys of the chunk are looked up, in batches"""
+        Client().get(reverse("read-timecards"))
+        keys = pd.Series(["TC000001", "TC000048"] + [f"TX{i:06}" for i in range(KEY_BATCH_SIZE)])
+        with self.assertNumQueries(2):
+            self.assertEqual(existing_keys(TimecardItems, keys), {"TC000001", "TC000048"})
+        with self.assertNumQueries(0):
+            self.assertEqual(existing_keys(TimecardItems, keys[:0]), set())
+
+    def test_read_in_parallel(self):
+        """Check if several files parsed in worker processes are all imported"""
+        first_file = os.path.join(settings.TIMECARDS_ROOT, "test.csv")
+        second_file = os.path.join(settings.TIMECARDS_ROOT, "test_copy.csv")
+        with open(first_file) as source, open(second_file, "w") as target:
+            target.write(source.read().replace("TC0", "TD0"))
+
+        results = list(import_files([first_file, second_file], "timecards", workers=2))
+
+        self.assertEqual(sorted(saved for _, saved, _ in results), [48, 48])
+        self.assertEqual(TimecardItems.objects.count(), 96)
+        self.assertEqual(ImportedFile.objects.count(), 2)
+
+    def test_broken_file_in_parallel(self):
+        """Check if a file that can not be parsed in a worker does not hold up the others"""
+        broken_file = os.path.join(settings.TIMECARDS_ROOT, "broken.csv")
+        with open(broken_file, "w") as fp:
+            fp.write("not,an,export\n1,2,3\n")
+        good_file = os.path.join(settings.TIMECARDS_ROOT, "test.csv")
+
+        results = {path: (saved, error) for path, saved, error in import_files([broken_file, good_file], "timecards", workers=2)}
+
+        self.assertIsNotNone(results[broken_file][1])
+        self.assertEqual(results[good_file], (48, None))
+        self.assertEqual(list(ImportedFile.objects.values_list("filename", flat=True)), ["test.csv"])
+
+    def test_queued_chunks(self):
+        """Check if the workers hand over their chunks through a bounded queue"""
+        abs_file_path = os.path.join(settings.TIMECARDS_ROOT, "test.csv")
+        expected = list(parse_file(abs_file_path, "timecards", 10))
+
+        queue = Queue(2)
+        with ThreadPoolExecutor(1) as pool:
+            pool.submit(_parse_into, queue, abs_file_path, "timecards", 10)
+            frames = list(_QueuedChunks(queue))
+        self.assertEqual([len(frame) for frame in frames], [len(frame) for frame in expected])
+        pd.testing.assert_frame_equal(frames[-1], expected[-1])
+
+        # a writer that stops after the first chunk leaves the worker free to go on
+        with ThreadPoolExecutor(1) as pool:
+            worker = pool.submit(_parse_into, queue, abs_file_path, "timecards", 10)
+            chunks = _QueuedChunks(queue)
+            next(iter(chunks))
+            chunks.drain()
+            worker.result(timeout=10)
+        self.assertTrue(queue.empty())
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+class Watch_Imports(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        setting_up_expenditures(self)
+
+    def test_watch_once(self):
+        """Check if files dropped into the upload folders are imported once"""
+        output = StringIO()
+        call_command("watch_imports", "--once", "--settle=0", stdout=output)
+        self.assertIn("saved 304 entries", output.getvalue())
+
+        output = StringIO()
+        call_command("watch_imports", "--once", "--settle=0", stdout=output)
+        self.assertIn("saved 0 entries", output.getvalue())
+
+    def test_unsettled_file(self):
+        """Check if files that are still being written are left alone"""
+        watcher = DirectoryWatcher(settle=3600)
+        self.assertEqual(watcher.scan(), 0)
+        self.assertEqual(TimecardItems.objects.count(), 0)
+
+    def test_claimed_file(self):
+        """Check if a file claimed by another process is not imported"""
+        abs_file_path = os.path.join(settings.TIMECARDS_ROOT, "test.csv")
+        sha256 = file_digest(abs_file_path)
+        self.assertIsNotNone(claim_file(abs_file_path, sha256, "timecards"))
+        self.assertIsNone(claim_file(abs_file_path, sha256, "timecards"))
+
+        self.assertEqual(next(import_files([abs_file_path], "timecards"))[1], 0)
+        self.assertEqual(TimecardItems.objects.count(), 0)
+
+    def test_failed_forced_import(self):
+        """Check if a failed forced re-import leaves the file imported"""
+        abs_file_path = os.path.join(settings.TIMECARDS_ROOT, "test.csv")
+        self.assertEqual(next(import_files([abs_file_path], "timecards"))[1], 48)
+        imported = ImportedFile.objects.values().get()
+
+        with patch("vmb.importer.store_file", side_effect=RuntimeError("broken")):
+            error = next(import_files([abs_file_path], "timecards", force=True))[2]
+        self.assertIsInstance(error, RuntimeError)
+        self.assertEqual(ImportedFile.objects.values().get(), imported)
+
+    def test_closed_early(self):
+        """Check if the claims of files not imported yet are released when the import stops"""
+        first_file = os.path.join(settings.TIMECARDS_ROOT, "test.csv")
+        second_file = os.path.join(settings.TIMECARDS_ROOT, "test_copy.csv")
+        with open(first_file) as source, open(second_file, "w") as target:
+            target.write(source.read().replace("TC0", "TD0"))
+        claimed = claim_file(first_file, file_digest(first_file), "timecards")
+
+        with patch("vmb.importer.ProcessPoolExecutor", side_effect=OSError("no processes")):
+            results = import_files([first_file, second_file], "timecards", workers=2)
+            self.assertEqual(next(results)[:2], (first_file, 0))
+            with self.assertRaises(OSError):
+                next(results)
+        self.assertEqual(list(ImportedFile.objects.values_list("sha256", flat=True)), [claimed.sha256])
+        self.assertIsNotNone(claim_file(second_file, file_digest(second_file), "timecards"))
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Import_Lock(TestCase):
+
+    def setUp(self):
+        setting_up_expenditures(self)
+
+    def test_lock(self):
+        """Check if only one import can hold the lock"""
+        with import_lock():
+            self.assertTrue(is_import_running())
+            with self.assertRaises(ImportRunning):
+                with import_lock():
+                    pass
+        self.assertFalse(is_import_running())
+
+    def test_import_running(self):
+        """Check if an import is refused while another one is running"""
+        client = Client()
+        with import_lock():
+            response = client.get(reverse("read-expenditures"))
+            self.assertEqual(response["location"], "/vmb/")
+            with self.assertRaises(CommandError):
+                call_command("import_expenditures", stdout=StringIO())
+
+        self.assertEqual(ImportJob.objects.count(), 0)
+        self.assertEqual(ExpenditureItem.objects.count(), 0)
+
+    def test_abandoned_lock(self):
+        """Check if a lock that has not been released is taken over after a while"""
+        ImportLock.objects.create(
+            name="import", owner="crashed", acquired_at=timezone.now() - timedelta(days=1)
+        )
+        with import_lock():
+            self.assertNotEqual(ImportLock.objects.get().owner, "crashed")
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+class Stream_Upload(TestCase):
+
+    def test_upload_and_import(self):
+        """Check if a file is imported while being uploaded, without keeping it"""
+        client = Client()
+        with open("test_data/test.csv", mode="rb") as fp:
+            response = client.post(
+                reverse("stream-upload-timecards") + "?keep=0", {"document": fp}
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(TimecardItems.objects.count(), 48)
+        self.assertEqual(ImportedFile.objects.get().rows, 48)
+        self.assertEqual(TimecardDocument.objects.count(), 0)
+
+    def test_upload_and_keep(self):
+        """Check if the uploaded file can be kept as a document"""
+        client = Client()
+        with open("test_data/test.tsv", mode="rb") as fp:
+            client.post(reverse("stream-upload-expenditures") + "?keep=1", {"document": fp})
+
+        self.assertEqual(ExpenditureItem.objects.count(), 256)
+        self.assertEqual(ExpenditureDocument.objects.get().filename(), "test.tsv")
+        self.assertTrue(os.path.isfile(os.path.join(settings.EXPENDITURE_ROOT, "test.tsv")))
+
+    @override_settings(IMPORT_CHUNK_SIZE=10)
+    def test_small_chunks(self):
+        """Check if records split across upload chunks are imported once"""
+        handler = StreamingImportUploadHandler(kind="expenditures")
+        handler.new_file("document", "test.tsv", "text/tab-separated-values", None)
+        with open("test_data/test.tsv", mode="rb") as fp:
+            raw_data = fp.read()
+        for start in range(0, len(raw_data), 7):
+            handler.receive_data_chunk(raw_data[start:start + 7], start)
+        self.assertEqual(ExpenditureItem.objects.count(), 250)
+        self.assertFalse(ImportedFile.objects.exists())
+        handler.file_complete(len(raw_data))
+
+        self.assertEqual(handler.rows, 256)
+        self.assertEqual(ExpenditureItem.objects.count(), 256)
+
+    def test_upload_twice(self):
+        """Check if content that has been imported already is skipped"""
+        client = Client()
+        for _ in range(2):
+            with open("test_data/test.csv", mode="rb") as fp:
+                client.post(reverse("stream-upload-timecards") + "?keep=0", {"document": fp})
+
+        self.assertEqual(TimecardItems.objects.count(), 48)
+        manifest = ImportedFile.objects.get()
+        self.assertEqual(manifest.state, "imported")
+        self.assertEqual(manifest.saved_entries, 48)
+
+    def test_upload_during_import(self):
+        """Check if an upload is refused while an import is running"""
+        with import_lock():
+            with open("test_data/test.csv", mode="rb") as fp:
+                response = Client().post(reverse("stream-upload-timecards") + "?keep=0", {"document": fp})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(TimecardItems.objects.count(), 0)
+        self.assertFalse(ImportedFile.objects.exists())
+
+    def test_failed_upload(self):
+        """Check if an upload that can not be imported is not added to the manifest"""
+        with patch("vmb.uploadhandlers.write_frames", side_effect=ValueError("broken")):
+            with open("test_data/test.csv", mode="rb") as fp:
+                Client().post(reverse("stream-upload-timecards") + "?keep=0", {"document": fp})
+
+        self.assertEqual(ImportedFile.objects.count(), 0)
+        self.assertEqual(TimecardItems.objects.count(), 0)
+
+    def test_csrf_before_body(self):
+        """Check if the CSRF token of the header is checked before the file is read"""
+        client = Client(enforce_csrf_checks=True)
+        url = reverse("stream-upload-timecards")
+        page = client.get(url)
+        token = str(page.context["csrf_token"])
+        self.assertNotContains(page, "csrfmiddlewaretoken")
+
+        # no token, the token in the query string or in the body, a wrong token in the header
+        attempts = [
+            (url + "?keep=0", {}, {}),
+            (url + "?keep=0&csrfmiddlewaretoken=" + token, {}, {}),
+            (url + "?keep=0", {"csrfmiddlewaretoken": token}, {}),
+            (url + "?keep=0", {}, {"X-CSRFToken": "x" * 64}),
+        ]
+        for path, data, headers in attempts:
+            with self.subTest(path=path, data=data, headers=headers):
+                with patch.object(StreamingImportUploadHandler, "receive_data_chunk") as receive:
+                    with open("test_data/test.csv", mode="rb") as fp:
+                        response = client.post(path, {**data, "document": fp}, headers=headers)
+                self.assertEqual(response.status_code, 403)
+                receive.assert_not_called()
+
+        with open("test_data/test.csv", mode="rb") as fp:
+            response = client.post(url + "?keep=0", {"document": fp}, headers={"X-CSRFToken": token})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(TimecardItems.objects.count(), 48)
+
+    def test_quoted_line_breaks(self):
+        """Check if line breaks inside of quoted fields do not end a record"""
+        complete, remainder = split_complete_records('a,b\n1,"x\ny"\n2,"z\n')
+        self.assertEqual(complete, 'a,b\n1,"x\ny"\n')
+        self.assertEqual(remainder, '2,"z\n')
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Hours_By_Team(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        Client().get(reverse("read-timecards"))
+
+    def test_pivot(self):
+        """Check if the hours by team and milestone come from one query"""
+        timecards = TimecardItems.objects.filter(project_id=12)
+        with self.assertNumQueries(1):
+            teams_lines = calculate_hours_by_team_and_milestone(timecards)
+
+        teams = [line["team"]["team"] for line in teams_lines]
+        self.assertEqual(teams, sorted(set(timecards.values_list("team", flat=True))))
+        for line in teams_lines:
+            for cell in line["sums"]:
+                expected = sum(
+                    timecard.total_hours
+                    for timecard in timecards.filter(team=line["team"]["team"])
+                    if timecard.milestone.get_name_display() == cell["milestone"]
+                )
+                self.assertEqual(cell["hours"]["sum"] or 0, expected)
+
+    def test_detail_pages(self):
+        """Check if the detail pages show the hours by team"""
+        client = Client()
+        response = client.get(reverse("timecard-detail-by-project", args=[12]))
+        self.assertEqual(response.status_code, 200)
+        response = client.get(reverse("timecard-detail-by-project-month", args=[12, "01Sep2024"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["hours_by_and_milestone"])
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Milestone_Rollup(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        setting_up_expenditures(self)
+        client = Client()
+        client.get(reverse("read-timecards"))
+        client.get(reverse("read-expenditures"))
+
+    def test_timecards(self):
+        """Check if hours, budget and delta by milestone come from one query"""
+        timecards = TimecardItems.objects.filter(project_id=12)
+        project = Project.objects.get(pk=12)
+        with self.assertNumQueries(1):
+            lines = ProjectAnalytics(project).milestone_lines
+
+        self.assertEqual(len(lines), Milestone.objects.filter(project_id=12).count())
+        for line in lines:
+            milestone = Milestone.objects.get(project_id=12, task=line["task"])
+            hours = sum(timecard.total_hours for timecard in timecards.filter(milestone=milestone))
+            self.assertEqual(line["name"], milestone.get_name_display())
+            self.assertAlmostEqual(line["hours"], float(hours))
+            self.assertAlmostEqual(line["delta"], float(milestone.sold_hours - hours))
+
+    def test_expenditures(self):
+        """Check if expenditure tasks are matched with their milestones in one query"""
+        project = Project.objects.get(pk=ExpenditureItem.objects.values_list("project", flat=True).first())
+        data = project.expenditureitem_set.filter(uom="Hours")
+        task = data.values_list("task", flat=True).first()
+        Milestone.objects.create(project=project, task=task, name="pm", cost_per_hour=0, sold_hours=100)
+
+        with self.assertNumQueries(1):
+            lines = expenditure_milestone_rollup(data)
+
+        self.assertEqual([line["task"] for line in lines], sorted(set(data.values_list("task", flat=True))))
+        for line in lines:
+            hours = sum(item.quantity for item in data.filter(task=line["task"]))
+            self.assertEqual(line["hours"], hours)
+            if line["task"] == task:
+                self.assertEqual(line["name"], "Project Manager")
+                self.assertEqual(line["delta"], 100 - hours)
+
+        response = Client().get(reverse("detail_by_project", args=[project.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Project Manager")
+
+    def test_queries_by_milestone(self):
+        """Check if the detail pages do not query once per milestone"""
+        client = Client()
+        url = reverse("timecard-detail-by-project", args=[12])
+        with CaptureQueriesContext(connection) as before:
+            client.get(url)
+
+        timecard = TimecardItems.objects.filter(project_id=12).first()
+        for task in ("7", "8", "9"):
+            milestone = Milestone.objects.create(project_id=12, task=task, name="arc", cost_per_hour=0, sold_hours=10)
+            TimecardItems.objects.create(
+                timecard_id=f"TX{task}", project_id=12, milestone=milestone, start_date=timecard.start_date,
+                name="emp_99", total_hours=1, deliver_location="Remote", notes="", team="T01",
+            )
+        rebuild_rollups()
+        with CaptureQueriesContext(connection) as after:
+            response = client.get(url)
+
+        self.assertEqual(len(response.context["sums_by_task"]), 6)
+        self.assertEqual(len(after), len(before))
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Project_Overview(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        Client().get(reverse("read-timecards"))
+        today = timezone.now().date()
+        Project.objects.filter(pk=12).update(
+            sold_hours=10000, type="cu", end_date=today + timedelta(days=10)
+        )
+        Project.objects.filter(pk=13).update(sold_hours=10, end_date=today + timedelta(days=100))
+
+    def test_overview(self):
+        """Check if hours left and ratio are calculated by the database"""
+        response = Client().get(reverse("timecard-overview"))
+        self.assertEqual(response.status_code, 200)
+
+        for project in response.context["hours_by_project"]:
+            hours = sum(timecard.total_hours for timecard in TimecardItems.objects.filter(project=project))
+            self.assertEqual(project.hours_sum, hours)
+            self.assertEqual(project.hours_left, project.sold_hours - hours)
+            self.assertAlmostEqual(project.ratio, float(100 * hours / project.sold_hours))
+
+    def test_filter_and_sort(self):
+        """Check if the overview can be filtered and sorted"""
+        client = Client()
+        url = reverse("timecard-overview")
+
+        def project_ids(**params):
+            response = client.get(url, params)
+            return [project.oracle_id for project in response.context["hours_by_project"]]
+
+        self.assertEqual(project_ids(), [12, 13])
+        self.assertEqual(project_ids(sort="-oracle_id"), [13, 12])
+        self.assertEqual(project_ids(sort="-ratio"), [13, 12])
+        self.assertEqual(project_ids(sort="unknown"), [12, 13])
+        self.assertEqual(project_ids(type="cu"), [12])
+        self.assertEqual(project_ids(overrun="1"), [13])
+        self.assertEqual(project_ids(ending="30"), [12])
+
+        group = Project_Group.objects.create(name="group")
+        Project.objects.filter(pk=13).update(project_group=group)
+        self.assertEqual(project_ids(group=str(group.id)), [13])
+
+    def test_queries_by_project(self):
+        """Check if the overview does not query once per project"""
+        client = Client()
+        with CaptureQueriesContext(connection) as before:
+            client.get(reverse("timecard-overview"))
+
+        timecard = TimecardItems.objects.first()
+        for oracle_id in range(20, 30):
+            project = Project.objects.create(
+                oracle_id=oracle_id, name="more", sold_hours=10, start_date=timecard.start_date, end_date=timecard.start_date
+            )
+            milestone = Milestone.objects.create(project=project, task="1", name="pm", cost_per_hour=0, sold_hours=10)
+            TimecardItems.objects.create(
+                timecard_id=f"TX{oracle_id}", project=project, milestone=milestone, start_date=timecard.start_date,
+                name="emp_99", total_hours=1, deliver_location="Remote", notes="", team="T01",
+            )
+        rebuild_rollups()
+        with CaptureQueriesContext(connection) as after:
+            response = client.get(reverse("timecard-overview"))
+
+        self.assertEqual(len(response.context["hours_by_project"]), 12)
+        self.assertEqual(len(after), len(before))
+
+    def test_expenditure_overview(self):
+        """Check if the expenditure overview only sums up hours"""
+        setting_up_expenditures(self)
+        client = Client()
+        client.get(reverse("read-expenditures"))
+        response = client.get(reverse("expenditure-overview"), {"sort": "-hours_sum"})
+        self.assertEqual(response.status_code, 200)
+
+        for project in response.context["hours_by_project"]:
+            hours = sum(item.quantity for item in ExpenditureItem.objects.filter(project=project, uom="Hours"))
+            self.assertEqual(project.hours_sum, hours)
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Rollups(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        setting_up_expenditures(self)
+        client = Client()
+        client.get(reverse("read-timecards"))
+        client.get(reverse("read-expenditures"))
+
+    def rollups(self):
+        return (
+            sorted(TimecardRollup.objects.values_list("project", "milestone", "team", "week", "month", "total_hours", "entries")),
+            sorted(ExpenditureRollup.objects.values_list("project", "task", "week", "quantity", "entries")),
+            sorted(MonthlyRollup.objects.values_list("project", "kind", "month", "hours", "entries")),
+        )
+
+    def test_import(self):
+        """Check if the importers keep the rollups in line with the items"""
+        imported = self.rollups()
+        self.assertEqual(sum(line[-1] for line in imported[0]), TimecardItems.objects.count())
+        self.assertEqual(
+            sum(line[-1] for line in imported[1]), ExpenditureItem.objects.filter(uom="Hours").count()
+        )
+
+        Client().get(reverse("read-timecards"))
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), imported)
+
+    def test_conflicting_rows(self):
+        """Check if a row that is stored meanwhile fails the chunk instead of being counted twice"""
+        imported = self.rollups()
+        frame = next(parse_file(os.path.join(settings.TIMECARDS_ROOT, "test.csv"), "timecards"))
+        with patch("vmb.importer.existing_keys", return_value=set()):
+            with self.assertRaises(IntegrityError):
+                with transaction.atomic():
+                    write_timecards(frame)
+        self.assertEqual(self.rollups(), imported)
+
+    def test_update_timecard(self):
+        """Check if editing a timecard moves its hours in the rollups"""
+        timecard = TimecardItems.objects.get(pk="TC000001")
+        milestone = Milestone.objects.get(project_id=12, task="1")
+        response = Client().post(
+            reverse("timecarditem-update", args=[timecard.pk]),
+            {
+                "name": timecard.name,
+                "project": timecard.project_id,
+                "milestone": milestone.id,
+                "total_hours": "7.25",
+                "deliver_location": timecard.deliver_location,
+                "team": "T09",
+                "notes": timecard.notes,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+
+        updated = self.rollups()
+        self.assertEqual(
+            TimecardRollup.objects.get(milestone=milestone, team="T09").total_hours, Decimal("7.25")
+        )
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), updated)
+
+    def test_update_during_import(self):
+        """Check if a timecard is not changed while an import is running"""
+        timecard = TimecardItems.objects.get(pk="TC000001")
+        rollups = self.rollups()
+        with import_lock():
+            response = Client().post(
+                reverse("timecarditem-update", args=[timecard.pk]),
+                {
+                    "name": timecard.name,
+                    "project": timecard.project_id,
+                    "milestone": timecard.milestone_id,
+                    "total_hours": "7.25",
+                    "deliver_location": timecard.deliver_location,
+                    "team": "T09",
+                    "notes": timecard.notes,
+                },
+            )
+        self.assertEqual(response["location"], reverse("timecarditem-update", args=[timecard.pk]))
+        self.assertEqual(TimecardItems.objects.get(pk="TC000001").total_hours, timecard.total_hours)
+        self.assertEqual(self.rollups(), rollups)
+
+    def test_delete_project(self):
+        """Check if the rollups of a deleted project are gone"""
+        Client().get(reverse("project_delete", args=[12]))
+        for model in (TimecardRollup, ExpenditureRollup, MonthlyRollup):
+            self.assertFalse(model.objects.filter(project_id=12).exists())
+
+    def test_migration_backfill(self):
+        """Check if the migration fills the rollups of a database upgraded with items only"""
+        imported = self.rollups()
+        for model in (TimecardRollup, ExpenditureRollup, MonthlyRollup):
+            model.objects.all().delete()
+        import_module("vmb.migrations.0018_backfill_rollups").rebuild_rollups(apps, None)
+        self.assertEqual(self.rollups(), imported)
+
+    def test_detail_without_expenditures(self):
+        """Check if the expenditure page of a project without expenditures can be shown"""
+        MonthlyRollup.objects.filter(project=12, kind="expenditures").delete()
+        response = Client().get(reverse("detail_by_project", args=[12]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_rebuild_command(self):
+        """Check if the rollups can be recomputed from scratch"""
+        imported = self.rollups()
+        TimecardRollup.objects.all().delete()
+        MonthlyRollup.objects.filter(project_id=13).delete()
+
+        out = StringIO()
+        call_command("rebuild_rollups", stdout=out)
+        self.assertIn("timecard weeks", out.getvalue())
+        self.assertEqual(self.rollups(), imported)
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Periods(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        setting_up_expenditures(self)
+        client = Client()
+        client.get(reverse("read-timecards"))
+        client.get(reverse("read-expenditures"))
+
+    def test_import(self):
+        """Check if the importers set week and month of every item"""
+        for timecard in TimecardItems.objects.all():
+            self.assertEqual(timecard.period_week.weekday(), 0)
+            self.assertEqual((timecard.start_date - timecard.period_week).days // 7, 0)
+            self.assertEqual(timecard.period_month, timecard.start_date.replace(day=1))
+        for item in ExpenditureItem.objects.all():
+            self.assertEqual(item.period_week, item.item_date - timedelta(days=item.item_date.weekday()))
+            self.assertEqual(item.period_month, item.item_date.replace(day=1))
+
+    def test_save(self):
+        """Check if saving a timecard sets its week and month"""
+        timecard = TimecardItems.objects.get(pk="TC000001")
+        timecard.start_date = date(2024, 12, 31)
+        timecard.save()
+        timecard.refresh_from_db()
+        self.assertEqual(timecard.period_week, date(2024, 12, 30))
+        self.assertEqual(timecard.period_month, date(2024, 12, 1))
+
+    def test_month_detail(self):
+        """Check if the month detail pages only show the items of the month"""
+        timecard = TimecardItems.objects.filter(project_id=12).first()
+        response = Client().get(
+            reverse("timecard-detail-by-project-month", args=[12, timecard.start_date.strftime("01%b%Y")])
+        )
+        timecards = response.context["timecards"]
+        self.assertTrue(timecards)
+        for line in timecards:
+            self.assertEqual(
+                (line.start_date.year, line.start_date.month), (timecard.start_date.year, timecard.start_date.month)
+            )
+        self.assertEqual(
+            timecards.count(),
+            sum(
+                1 for line in TimecardItems.objects.filter(project_id=12)
+                if line.start_date.strftime("%Y%m") == timecard.start_date.strftime("%Y%m")
+            ),
+        )
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+HOT_TABLES = (
+    "vmb_timecarditems",
+    "vmb_expenditureitem",
+    "vmb_milestone",
+    "vmb_timecardrollup",
+    "vmb_expenditurerollup",
+    "vmb_monthlyrollup",
+)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Query_Plans(TestCase):
+    """runs EXPLAIN QUERY PLAN on the queries of the pages and the importer"""
+
+    def setUp(self):
+        setting_up_timecards(self)
+        setting_up_expenditures(self)
+
+    def full_scans(self, queries) -> list:
+        scans = []
+        for query in queries:
+            sql = query["sql"]
+            if not sql.startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                plan = [line[-1] for line in cursor.fetchall()]
+            # a SCAN ... USING (COVERING) INDEX still reads the whole index, only SEARCH is accepted
+            for step in plan:
+                words = step.split()
+                if words[0] == "SCAN" and words[1] in HOT_TABLES:
+                    scans.append(f"{step} in {sql}")
+        return scans
+
+    def test_index_scans(self):
+        """Check if a scan through an index of a hot table counts as a full scan"""
+        Client().get(reverse("read-timecards"))
+        with CaptureQueriesContext(connection) as queries:
+            list(TimecardItems.objects.values_list("project", flat=True))
+            list(TimecardItems.objects.filter(project=12).values_list("start_date", flat=True))
+        scans = self.full_scans(queries)
+        self.assertEqual(len(scans), 1)
+        self.assertIn("USING COVERING INDEX", scans[0])
+
+    def test_import(self):
+        """Check if importing does not scan the hot tables"""
+        client = Client()
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse("read-timecards"))
+            client.get(reverse("read-expenditures"))
+        self.assertEqual(self.full_scans(queries), [])
+
+    def test_indexes(self):
+        """Check if the filters of the pages use their composite index"""
+        Client().get(reverse("read-timecards"))
+        month = date(2024, 9, 1)
+        shapes = [
+            (
+                TimecardItems.objects.filter(project=12, start_date__gte=month, start_date__lt=date(2024, 10, 1)),
+                "timecard_project_date_idx",
+            ),
+            (
+                TimecardItems.objects.filter(
+                    project__in=[12, 13], start_date__gte=month, start_date__lt=date(2024, 10, 1)
+                ),
+                "timecard_project_date_idx",
+            ),
+            (
+                ExpenditureItem.objects.filter(
+                    project=12, uom="Hours", item_date__gte=month, item_date__lt=date(2024, 10, 1)
+                ),
+                "expenditure_project_date_idx",
+            ),
+            (Milestone.objects.filter(project=12, task="1"), "milestone_project_task_idx"),
+        ]
+        for queryset, index in shapes:
+            with self.subTest(index=index):
+                self.assertIn(f"USING INDEX {index}", queryset.explain())
+
+    def test_period_columns(self):
+        """Check if the period columns, only read by the rollup rebuild, carry no index"""
+        with connection.cursor() as cursor:
+            for table in ("vmb_timecarditems", "vmb_expenditureitem"):
+                constraints = connection.introspection.get_constraints(cursor, table)
+                indexed = {column for constraint in constraints.values() if constraint["index"] for column in constraint["columns"]}
+                self.assertEqual(indexed & {"period_week", "period_month"}, set())
+
+    def test_pages(self):
+        """Check if the pages do not scan the hot tables"""
+        client = Client()
+        client.get(reverse("read-timecards"))
+        client.get(reverse("read-expenditures"))
+        group = Project_Group.objects.create(name="group")
+        Project.objects.filter(pk__in=[12, 13]).update(project_group=group)
+        month = TimecardItems.objects.first().start_date.strftime("01%b%Y")
+
+        urls = [
+            reverse("timecard-overview"),
+            reverse("expenditure-overview"),
+            reverse("timecard-detail-by-project", args=[12]),
+            reverse("timecard-detail-by-project-month", args=[12, month]),
+            reverse("detail_by_project", args=[12]),
+            reverse("detail_by_project_month", args=[12, month]),
+            reverse("project_group_detail", args=[group.id]),
+            reverse("report-timecards", args=[12]),
+            reverse("report_timecards_by_group", args=[group.id]),
+            reverse("report_timecards_by_group_by_month", args=[group.id, month]),
+        ]
+        for url in urls:
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.full_scans(queries), [])
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+class Period_Windows(TestCase):
+
+    def test_windows(self):
+        """Check if periods are turned into half-open date windows"""
+        day = date(2024, 11, 15)
+        self.assertEqual(period_window(day), (date(2024, 11, 1), date(2024, 12, 1)))
+        self.assertEqual(period_window(date(2024, 12, 3)), (date(2024, 12, 1), date(2025, 1, 1)))
+        self.assertEqual(period_window(day, "quarter"), (date(2024, 10, 1), date(2025, 1, 1)))
+        self.assertEqual(period_window(day, "year"), (date(2024, 1, 1), date(2025, 1, 1)))
+        self.assertEqual(
+            period_window(date(2024, 1, 1), "fiscal", fiscal_start_day=26), (date(2023, 12, 26), date(2024, 1, 26))
+        )
+        self.assertEqual(
+            period_window(day, "custom", date(2024, 2, 1), date(2024, 2, 29)), (date(2024, 2, 1), date(2024, 3, 1))
+        )
+        with self.assertRaises(ValueError):
+            period_window(day, "custom", date(2024, 2, 1), date(2024, 1, 1))
+        with self.assertRaises(ValueError):
+            period_window(day, "decade")
+        self.assertEqual(
+            date_range("start_date", period_window(day)),
+            {"start_date__gte": date(2024, 11, 1), "start_date__lt": date(2024, 12, 1)},
+        )
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Period_Reports(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        Client().get(reverse("read-timecards"))
+        # same month a year earlier, must not show up in the reports of the month
+        timecard = TimecardItems.objects.get(pk="TC000001")
+        TimecardItems.objects.create(
+            timecard_id="TX000001", project_id=12, milestone=timecard.milestone,
+            start_date=timecard.start_date.replace(year=timecard.start_date.year - 1),
+            name="emp_99", total_hours=1, deliver_location="Remote", notes="", team="T01",
+        )
+        self.month = timecard.start_date.strftime("01%b%Y")
+        self.window = period_window(timecard.start_date)
+
+    def test_report_customer(self):
+        """Check if the customer report only contains the month of the given year"""
+        response = Client().get(reverse("report-timecards-month", args=[12, self.month]))
+        self.assertEqual(response.status_code, 200)
+        report = response.content.decode()
+        self.assertNotIn("emp_99", report)
+        expected = TimecardItems.objects.filter(project_id=12, **date_range("start_date", self.window)).count()
+        self.assertEqual(len(report.strip().splitlines()) - 1, expected)
+
+    def test_periods(self):
+        """Check if the month pages can show other periods"""
+        client = Client()
+        url = reverse("timecard-detail-by-project-month", args=[12, self.month])
+        month = client.get(url).context["timecards"].count()
+        year = client.get(url, {"period": "year"}).context["timecards"].count()
+        self.assertGreaterEqual(year, month)
+        self.assertEqual(year, TimecardItems.objects.filter(project_id=12, start_date__year=self.window[0].year).count())
+
+        start, end = self.window
+        response = client.get(url, {"period": "custom", "start": start.isoformat(), "end": start.isoformat()})
+        self.assertEqual(
+            response.context["timecards"].count(), TimecardItems.objects.filter(project_id=12, start_date=start).count()
+        )
+
+        response = client.get(url, {"period": "custom", "start": "2024-13-01", "end": "2024-01-01"})
+        self.assertEqual(response.status_code, 400)
+        response = client.get(reverse("detail_by_project_month", args=[12, self.month]), {"period": "quarter"})
+        self.assertEqual(response.status_code, 200)
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Project_Analytics(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        Client().get(reverse("read-timecards"))
+        self.project = Project.objects.get(pk=12)
+
+    def test_tables(self):
+        """Check if the tables derived from the frame match the database"""
+        with self.assertNumQueries(1):
+            analytics = ProjectAnalytics(self.project)
+            timecards = TimecardItems.objects.filter(project=self.project)
+            hours_by_month = analytics.hours_by_month
+            team_lines = analytics.team_lines
+            milestone_lines = analytics.milestone_lines
+            analytics.burndown("week")
+
+        for line in hours_by_month:
+            hours = sum(t.total_hours for t in timecards if t.start_date.replace(day=1) == line["month"])
+            self.assertAlmostEqual(line["sum"], float(hours))
+        self.assertAlmostEqual(analytics.hours_sum["sum"], float(sum(t.total_hours for t in timecards)))
+        self.assertEqual(team_lines, calculate_hours_by_team_and_milestone(timecards))
+        milestones = Milestone.objects.filter(project=self.project).order_by("task", "id")
+        expected = []
+        for milestone in milestones:
+            hours = sum(t.total_hours for t in timecards if t.milestone_id == milestone.id)
+            if hours:
+                expected.append((milestone.get_name_display(), float(hours), float(milestone.sold_hours - hours)))
+        self.assertEqual([(line["name"], line["hours"], line["delta"]) for line in milestone_lines], expected)
+
+    def test_burndown(self):
+        """Check if the burndown series count down from the sold hours"""
+        analytics = ProjectAnalytics(self.project)
+        weeks, sums, burned = analytics.burndown("week")
+        self.assertEqual(weeks, sorted(weeks))
+        self.assertTrue(all(week.weekday() == 0 for week in weeks))
+        self.assertAlmostEqual(burned[-1], float(self.project.sold_hours) - analytics.hours_sum["sum"])
+        months, sums, burned = analytics.burndown("month")
+        self.assertEqual(len(months), len(analytics.hours_by_month))
+
+    def test_one_data_query(self):
+        """Check if the detail page reads the hours of the project once"""
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(reverse("timecard-detail-by-project", args=[12]))
+        self.assertEqual(response.status_code, 200)
+        data_queries = [
+            query["sql"] for query in queries
+            if "vmb_timecard" in query["sql"] or "vmb_monthlyrollup" in query["sql"]
+        ]
+        self.assertEqual(len(data_queries), 1)
+
+    def test_empty_project(self):
+        """Check if a project without timecards can be shown"""
+        project = Project.objects.create(
+            oracle_id=99, name="empty", sold_hours=10, start_date="2024-01-01", end_date="2024-12-31"
+        )
+        analytics = ProjectAnalytics(project)
+        self.assertEqual(analytics.hours_by_month, [])
+        self.assertEqual(analytics.team_lines, [])
+        self.assertIsNone(analytics.avg_burned)
+        self.assertEqual(Client().get(reverse("timecard-detail-by-project", args=[99])).status_code, 200)
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Group_Analytics(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        Client().get(reverse("read-timecards"))
+        self.group = Project_Group.objects.create(name="group")
+        Project.objects.filter(pk__in=[12, 13]).update(project_group=self.group)
+
+    def test_totals(self):
+        """Check if the group totals and the breakdown by project match the database"""
+        with self.assertNumQueries(1):
+            analytics = GroupAnalytics(self.group)
+            hours_by_month = analytics.hours_by_month
+            hours_by_project = analytics.hours_by_project
+            analytics.team_lines
+            analytics.milestone_sum
+            analytics.series()
+
+        timecards = TimecardItems.objects.filter(project__project_group=self.group)
+        for line in hours_by_month:
+            hours = sum(t.total_hours for t in timecards if t.start_date.replace(day=1) == line["month"])
+            self.assertAlmostEqual(line["sum"], float(hours))
+        for project in (12, 13):
+            hours = sum(t.total_hours for t in timecards if t.project_id == project)
+            self.assertAlmostEqual(hours_by_project.get(project, 0), float(hours))
+        self.assertAlmostEqual(analytics.hours_sum["sum"], float(sum(t.total_hours for t in timecards)))
+        self.assertAlmostEqual(sum(analytics.milestone_sum.values()), analytics.hours_sum["sum"])
+        self.assertEqual(analytics.team_lines, calculate_hours_by_team_and_milestone(timecards))
+
+    def test_constant_queries(self):
+        """Check if the detail page does not query the database once per project"""
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                response = Client().get(reverse("project_group_detail", args=[self.group.id]))
+            self.assertEqual(response.status_code, 200)
+            return len(captured)
+
+        Project.objects.filter(pk=13).update(project_group=None)
+        one_project = queries()
+        Project.objects.filter(pk=13).update(project_group=self.group)
+        self.assertEqual(queries(), one_project)
+
+    def test_empty_group(self):
+        """Check if a group without timecards can be shown"""
+        group = Project_Group.objects.create(name="empty")
+        analytics = GroupAnalytics(group)
+        self.assertEqual(analytics.hours_by_month, [])
+        self.assertIsNone(analytics.hours_sum["sum"])
+        self.assertEqual(analytics.milestone_sum, {})
+        self.assertEqual(Client().get(reverse("project_group_detail", args=[group.id])).status_code, 200)
+
     def tearDown(self):
         cleaning_up(self)
 
@@ -113,6 +1201,373 @@ class BurndownTestCase(TestCase):
         self.assertEqual(btest.runtime_in_month(), 12)
 
 
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Purge_Projects(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        setting_up_expenditures(self)
+        Client().get(reverse("read-timecards"))
+        Client().get(reverse("read-expenditures"))
+
+    def counts(self, project_id):
+        return {
+            model.__name__: model.objects.filter(project_id=project_id).count()
+            for model in (TimecardRollup, TimecardItems, ExpenditureRollup, ExpenditureItem, MonthlyRollup, Milestone)
+        }
+
+    def test_purge(self):
+        """Check if a project and all its rows are removed with one statement per table"""
+        expected = self.counts(12)
+        other = self.counts(13)
+        with self.assertNumQueries(len(PURGE_ORDER) + 3):
+            removed = purge_projects([12])
+        self.assertEqual(removed, {**expected, "Project": 1, "ImportedFile": 2})
+        self.assertEqual(self.counts(12), dict.fromkeys(expected, 0))
+        self.assertEqual(self.counts(13), other)
+        self.assertFalse(Project.objects.filter(pk=12).exists())
+
+    def test_purge_view(self):
+        """Check if the group view purges the projects of the group but keeps the group"""
+        group = Project_Group.objects.create(name="group")
+        Project.objects.filter(pk__in=[12, 13]).update(project_group=group)
+        client = Client(enforce_csrf_checks=True)
+        url = reverse("project_group_purge", args=[group.id])
+        self.assertEqual(client.get(url).status_code, 405)
+        self.assertEqual(client.post(url, {"confirm": "1"}).status_code, 403)
+
+        response = client.get(reverse("project_group_detail", args=[group.id]))
+        self.assertContains(response, 'name="confirm"')
+        token = response.context["csrf_token"]
+        client.post(url, {"csrfmiddlewaretoken": token})
+        self.assertEqual(Project.objects.filter(pk__in=[12, 13]).count(), 2)
+
+        response = client.post(url, {"csrfmiddlewaretoken": token, "confirm": "1"})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Project.objects.filter(pk__in=[12, 13]).exists())
+        self.assertFalse(TimecardItems.objects.exists())
+        self.assertTrue(Project_Group.objects.filter(pk=group.id).exists())
+
+    def test_many_projects(self):
+        """Check if a purge of more projects than a statement can take is split up"""
+        project_ids = [12, *range(100000, 100000 + KEY_BATCH_SIZE), 13]
+        with self.assertNumQueries(2 * len(PURGE_ORDER) + 3):
+            removed = purge_projects(project_ids)
+        self.assertEqual(removed["Project"], 2)
+        self.assertFalse(TimecardItems.objects.exists())
+
+    def test_import_again(self):
+        """Check if the export of a purged project can be imported again"""
+        expected = self.counts(12)
+        purge_projects([12])
+        Client().get(reverse("read-timecards"))
+        Client().get(reverse("read-expenditures"))
+        self.assertEqual(self.counts(12), expected)
+        self.assertEqual(ImportedFile.objects.filter(state="imported").count(), 2)
+
+    def test_purge_command(self):
+        """Check if the command purges a group and reports the rows removed"""
+        group = Project_Group.objects.create(name="group")
+        Project.objects.filter(pk=13).update(project_group=group)
+        expected = self.counts(13)
+        out = StringIO()
+        call_command("purge_projects", "--group", str(group.id), stdout=out)
+        self.assertIn(f"{expected['TimecardItems']} TimecardItems removed", out.getvalue())
+        self.assertIn("1 Project removed", out.getvalue())
+        self.assertTrue(Project.objects.filter(pk=12).exists())
+        with self.assertRaises(CommandError):
+            call_command("purge_projects", stdout=StringIO())
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+class Charts(TestCase):
+
+    def setUp(self):
+        self.weeks = [date(2024, 9, 2) + timedelta(weeks=i) for i in range(12)]
+        self.sums = [float(i % 5 + 1) for i in range(12)]
+        self.remaining = [100 - sum(self.sums[: i + 1]) for i in range(12)]
+
+    def chart(self):
+        return render(burndown_chart("test", self.weeks, self.sums, self.remaining, self.weeks, self.remaining))
+
+    def test_formats(self):
+        """Check if charts are rendered as png and svg"""
+        self.assertTrue(self.chart().startswith(b"\x89PNG"))
+        svg = render(bar_chart(self.weeks, self.sums, "hours"), "svg")
+        self.assertIn(b"<svg", svg)
+        with self.assertRaises(ValueError):
+            render(bar_chart(self.weeks, self.sums, "hours"), "gif")
+
+    def test_threads(self):
+        """Check if charts rendered in parallel threads are the same as one rendered alone"""
+        expected = self.chart()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            images = list(pool.map(lambda _: self.chart(), range(8)))
+        self.assertEqual(images, [expected] * 8)
+
+
+class Chart_Cache(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.settings = override_settings(CHART_CACHE_ROOT=self.root, CHART_CACHE_MAX_BYTES=1000)
+        self.settings.enable()
+        self.renders = 0
+
+    def render(self, size=100):
+        self.renders += 1
+        return b"x" * size
+
+    def test_hit(self):
+        """Check if a cached chart is not rendered again"""
+        first = cached_chart("timecards", 12, "week", 1, "png", self.render)
+        second = cached_chart("timecards", 12, "week", 1, "png", self.render)
+        self.assertEqual(first, second)
+        self.assertEqual(self.renders, 1)
+        cached_chart("timecards", 12, "week", 1, "svg", self.render)
+        self.assertEqual(self.renders, 2)
+
+    def test_version(self):
+        """Check if a new data version renders the chart again and drops the old one"""
+        cached_chart("timecards", 12, "week", 1, "png", self.render)
+        cached_chart("timecards", 12, "week", 2, "png", self.render)
+        self.assertEqual(self.renders, 2)
+        self.assertEqual(os.listdir(self.root), ["timecards-12-week-2.png"])
+
+    def test_eviction(self):
+        """Check if the least recently used charts are removed once the cache is full"""
+        for project in range(3):
+            cached_chart("timecards", project, "week", 1, "png", lambda: self.render(300))
+            os.utime(os.path.join(self.root, f"timecards-{project}-week-1.png"), (project, project))
+        cached_chart("timecards", 0, "week", 1, "png", self.render)
+        cached_chart("timecards", 3, "week", 1, "png", lambda: self.render(300))
+        self.assertEqual(self.renders, 4)
+        self.assertEqual(
+            sorted(os.listdir(self.root)),
+            ["timecards-0-week-1.png", "timecards-2-week-1.png", "timecards-3-week-1.png"],
+        )
+        evict(0)
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_group_version(self):
+        """Check if the group version follows its members and their versions"""
+        first = Project(oracle_id=1, data_version=0)
+        second = Project(oracle_id=2, data_version=0)
+        version = group_data_version([first, second])
+        self.assertNotEqual(group_data_version([first]), version)
+        second.data_version = 1
+        self.assertNotEqual(group_data_version([first, second]), version)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.root)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False)
+class Data_Version(TestCase):
+
+    def setUp(self):
+        setting_up_timecards(self)
+        Client().get(reverse("read-timecards"))
+
+    def test_bumped(self):
+        """Check if imports and edits bump the data version of a project"""
+        project = Project.objects.get(pk=12)
+        self.assertGreater(project.data_version, 0)
+        timecard = TimecardItems.objects.filter(project=project).first()
+        Client().post(
+            reverse("timecarditem-update", args=[timecard.pk]),
+            {
+                "name": timecard.name,
+                "project": timecard.project_id,
+                "milestone": timecard.milestone_id,
+                "total_hours": "1.5",
+                "deliver_location": timecard.deliver_location,
+                "team": timecard.team,
+                "notes": timecard.notes,
+            },
+        )
+        self.assertGreater(Project.objects.get(pk=12).data_version, project.data_version)
+
+    def test_project_edit(self):
+        """Check if editing a project does not undo a bump of an import meanwhile"""
+        project = Project.objects.get(pk=12)
+        stale = Project.objects.get(pk=12)
+        Project.objects.filter(pk=12).update(data_version=F("data_version") + 1)
+        with patch.object(views.ProjectUpdateView, "get_object", return_value=stale):
+            response = Client().post(
+                reverse("project_update", args=[12]),
+                {
+                    "name": "renamed",
+                    "sold_hours": project.sold_hours,
+                    "start_date": project.start_date,
+                    "end_date": project.end_date,
+                    "type": project.type,
+                    "ideal_shape": project.ideal_shape,
+                    "project_group": "",
+                },
+            )
+        self.assertEqual(response.status_code, 302)
+        edited = Project.objects.get(pk=12)
+        self.assertEqual(edited.name, "renamed")
+        self.assertEqual(edited.data_version, project.data_version + 2)
+
+    def test_cached_chart(self):
+        """Check if the chart of a project is rendered only once per data version"""
+        url = reverse("project-chart", args=[12, "timecards", "png"])
+        Client().get(url)
+        charts = sorted(os.listdir(settings.CHART_CACHE_ROOT))
+        self.assertEqual(len([chart for chart in charts if chart.startswith("timecards-12-")]), 1)
+        with patch("vmb.helper.render") as render:
+            Client().get(url)
+        render.assert_not_called()
+        self.assertEqual(sorted(os.listdir(settings.CHART_CACHE_ROOT)), charts)
+
+    def test_chart_images(self):
+        """Check if the charts are served with ETags and 304 once the browser has them"""
+        url = reverse("project-chart", args=[12, "timecards", "png"])
+        response = Client().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertTrue(response.content.startswith(b"\x89PNG"))
+        etag = response["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+
+        with patch("vmb.views.project_chart") as chart:
+            response = Client().get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        chart.assert_not_called()
+
+        Project.objects.filter(pk=12).update(data_version=F("data_version") + 1)
+        self.assertEqual(Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.assertEqual(Client().get(url, {"timeframe": "day"}).status_code, 400)
+        self.assertEqual(Client().get(reverse("project-chart", args=[12, "other", "png"])).status_code, 404)
+
+    def test_series(self):
+        """Check if the burndown series are served as json from one aggregate query"""
+        url = reverse("project-chart-series", args=[12, "timecards"])
+        with self.assertNumQueries(2):
+            response = Client().get(url)
+        self.assertEqual(response["Content-Type"], "application/json")
+        series = response.json()
+        weeks, sums, remaining = ProjectAnalytics(Project.objects.get(pk=12)).burndown("week")
+        self.assertEqual(series["periods"], [week.isoformat() for week in weeks])
+        self.assertEqual(series["burned"], sums)
+        self.assertEqual(series["remaining"], remaining)
+        self.assertEqual(len(series["ideal"]["periods"]), len(series["ideal"]["remaining"]))
+        self.assertEqual(Client().get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        expenditures = Client().get(reverse("project-chart-series", args=[12, "expenditures"]), {"timeframe": "month"})
+        self.assertEqual(expenditures.json()["timeframe"], "month")
+
+        group = Project_Group.objects.create(name="group")
+        Project.objects.filter(pk__in=[12, 13]).update(project_group=group)
+        with self.assertNumQueries(3):
+            series = Client().get(reverse("project-group-chart-series", args=[group.id])).json()
+        self.assertEqual(series["burned"], GroupAnalytics(group).series()[1])
+
+    def test_client_charts(self):
+        """Check if the pages draw the charts in the browser when asked to"""
+        url = reverse("timecard-detail-by-project", args=[12])
+        page = Client().get(url).content.decode()
+        self.assertIn(reverse("project-chart", args=[12, "timecards", "png"]), page)
+        self.assertNotIn("data-chart-series", page)
+        page = Client().get(url, {"charts": "client"}).content.decode()
+        self.assertIn(reverse("project-chart-series", args=[12, "timecards"]), page)
+        self.assertIn("vmb/charts.js", page)
+        with override_settings(CHART_RENDERING="client"):
+            self.assertContains(Client().get(url), "data-chart-series")
+
+    def test_svg_gzip(self):
+        """Check if svg charts are gzipped for browsers accepting it"""
+        url = reverse("project-chart", args=[12, "expenditures", "svg"])
+        plain = Client().get(url, {"timeframe": "month"})
+        self.assertEqual(plain["Content-Type"], "image/svg+xml")
+        self.assertIn(b"<svg", plain.content)
+        zipped = Client().get(url, {"timeframe": "month"}, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(zipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(zipped.content), plain.content)
+        self.assertNotEqual(zipped["ETag"], plain["ETag"])
+
+    def test_group_chart(self):
+        """Check if the group page links its chart and the chart follows the member projects"""
+        group = Project_Group.objects.create(name="group")
+        Project.objects.filter(pk=12).update(project_group=group)
+        url = reverse("project-group-chart", args=[group.id, "png"])
+        self.assertContains(Client().get(reverse("project_group_detail", args=[group.id])), url)
+        etag = Client().get(url)["ETag"]
+        self.assertEqual(Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Project.objects.filter(pk=13).update(project_group=group)
+        self.assertEqual(Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def tearDown(self):
+        cleaning_up(self)
+
+
+class Ideal_Burndown(TestCase):
+
+    def test_linear(self):
+        """Check if the linear curve matches burning the same hours every week"""
+        start, end = date(2024, 9, 2), date(2024, 12, 30)
+        weeks, remaining = ideal_burndown(750.0, start, end)
+        runtime = 17
+        self.assertEqual(len(weeks), runtime)
+        self.assertEqual(weeks[1].item(), date(2024, 9, 9))
+        for i, hours in enumerate(remaining):
+            self.assertAlmostEqual(hours, 750 - (i + 1) * 750 / runtime)
+        self.assertAlmostEqual(remaining[-1], 0)
+
+    def test_months(self):
+        """Check if months past the end of a shorter month are clipped"""
+        months, remaining = ideal_burndown(300.0, date(2024, 1, 31), date(2024, 4, 30), "month")
+        self.assertEqual([month.item() for month in months], [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31)])
+        self.assertEqual(remaining.tolist(), [200.0, 100.0, 0.0])
+
+    def test_shapes(self):
+        """Check if every shape burns all hours and front-loaded burns faster than an S-curve"""
+        start, end = date(2024, 1, 1), date(2033, 12, 26)
+        linear = ideal_burndown(1000.0, start, end)[1]
+        front = ideal_burndown(1000.0, start, end, shape="front")[1]
+        s_curve = ideal_burndown(1000.0, start, end, shape="s")[1]
+        weighted = ideal_burndown(1000.0, start, end, shape="milestones", weights=(3.0, 1.0))[1]
+        for curve in (linear, front, s_curve, weighted):
+            self.assertGreater(len(curve), 500)
+            self.assertAlmostEqual(curve[-1], 0)
+            self.assertTrue((curve[1:] <= curve[:-1]).all())
+        middle = len(linear) // 2 - 1
+        self.assertLess(front[middle], linear[middle])
+        self.assertGreater(s_curve[middle // 2], linear[middle // 2])
+        self.assertAlmostEqual(weighted[middle], 250, delta=5)
+        with self.assertRaises(ValueError):
+            ideal_burndown(1000.0, start, end, shape="other")
+
+    def test_memoized(self):
+        """Check if a curve is computed once and cannot be changed by its users"""
+        first = ideal_burndown(500.0, date(2024, 1, 1), date(2024, 6, 24))
+        self.assertIs(ideal_burndown(500.0, date(2024, 1, 1), date(2024, 6, 24)), first)
+        with self.assertRaises(ValueError):
+            first[1][0] = 0
+        self.assertEqual(len(ideal_burndown(500.0, date(2024, 1, 1), date(2024, 1, 3))[0]), 0)
+
+    def test_project(self):
+        """Check if a project uses its shape and the sold hours of its milestones"""
+        project = Project.objects.create(
+            oracle_id=77, name="shape", sold_hours=400, start_date=date(2024, 1, 1),
+            end_date=date(2024, 3, 25), ideal_shape="milestones",
+        )
+        Milestone.objects.create(project=project, task="1", name="pm", cost_per_hour=100, sold_hours=100)
+        Milestone.objects.create(project=project, task="2", name="con", cost_per_hour=100, sold_hours=300)
+        self.assertEqual(project.ideal_weights(), (100.0, 300.0))
+        weeks, remaining = project.ideal_burndown_by_weeks()
+        self.assertEqual(len(weeks), 12)
+        self.assertAlmostEqual(remaining[5], 300)
+        self.assertEqual(project.ideal_weights("linear"), ())
+        self.assertAlmostEqual(project.ideal_burndown_by_month("linear")[1][0], 400 - 400 / 2)
+
+
 def setting_up_expenditures(self):
     client = Client()
     with open("test_data/test.tsv", mode="rb") as fp:
@@ -144,3 +1599,5 @@ def cleaning_up(self):
             os.remove(os.path.join(settings.TIMECARDS_ROOT, f))
     except Exception as e:
         logger.warn(f"Could not delete files in {settings.TIMECARDS_ROOT}: {e}")
+
+    clear()
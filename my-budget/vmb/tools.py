@@ -9,3 +9,58 @@ def diff_weeks(d1, d2):
 
     return (monday2 - monday1).days / 7
 
+
+
+def week_of(day):
+    '''the monday of the week the day is in'''
+    return day - timedelta(days=day.weekday())
+
+def month_of(day):
+    '''the first day of the month the day is in'''
+    return day.replace(day=1)
+
+def add_months(day, months):
+    '''the same day of month some months later, day must be the first of a month'''
+    month = day.month - 1 + months
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1)
+
+
+PERIODS = ("month", "quarter", "year", "fiscal", "custom")
+
+def period_window(month, period="month", start=None, end=None, fiscal_start_day=1):
+    """
+    returns the half-open window (start, end) of the period around the
+    given month, the end is the first day after the period:
+
+    month    the calendar month
+    quarter  the calendar quarter
+    year     the calendar year
+    fiscal   the fiscal month, starting on fiscal_start_day of the month before
+    custom   start to end, both days included
+    """
+    first = month_of(month)
+    if period == "month":
+        return first, add_months(first, 1)
+    if period == "quarter":
+        first = first.replace(month=(first.month - 1) // 3 * 3 + 1)
+        return first, add_months(first, 3)
+    if period == "year":
+        first = first.replace(month=1)
+        return first, add_months(first, 12)
+    if period == "fiscal":
+        if fiscal_start_day == 1:
+            return first, add_months(first, 1)
+        return (
+            add_months(first, -1).replace(day=fiscal_start_day),
+            first.replace(day=fiscal_start_day),
+        )
+    if period == "custom":
+        if start is None or end is None or end < start:
+            raise ValueError("a custom period needs a start before its end")
+        return start, end + timedelta(days=1)
+    raise ValueError(f"unknown period {period}, use one of {', '.join(PERIODS)}")
+
+def date_range(field, window):
+    '''filter arguments selecting the half-open window on a date field'''
+    start, end = window
+    return {f"{field}__gte": start, f"{field}__lt": end}
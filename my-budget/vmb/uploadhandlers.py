@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from logging import getLogger
+
+import codecs
+import hashlib
+
+from .importer import FILE_FORMATS, parse_records, record_import, write_frames
+from .locks import import_lock
+from .models import ImportedFile
+
+
+logger = getLogger(__name__)
+
+
+def split_complete_records(text: str):
+    """
+    splits decoded text after the last line break that is not inside a
+    quoted field, returns the complete records and the remainder
+    """
+    quotes = text.count('"')
+    end = len(text)
+    while True:
+        cut = text.rfind("\n", 0, end)
+        if cut < 0:
+            return "", text
+        quotes -= text.count('"', cut, end)
+        if quotes % 2 == 0:
+            return text[: cut + 1], text[cut + 1 :]
+        end = cut
+
+
+class StreamingImportUploadHandler(FileUploadHandler):
+    """
+    imports an export while it is being uploaded: the chunks are decoded,
+    cut into complete records and handed to the bulk inserter every
+    IMPORT_CHUNK_SIZE rows, the raw file is never written to disk. Each
+    chunk is committed on its own under the import lock, rows that are
+    stored already are skipped, so a repeated or broken off upload is safe.
+    The file is added to the manifest once it is complete.
+
+    With keep_file the raw chunks are passed on to the next upload handler,
+    so the upload ends up in request.FILES as well.
+    """
+
+    def __init__(self, request=None, kind: str = "timecards", keep_file: bool = False):
+        super().__init__(request)
+        self.kind = kind
+        self.keep_file = keep_file
+        self.rows = 0
+        self.saved_entries = 0
+        self.imported = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        encoding = FILE_FORMATS[self.kind][1]
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.sha256 = hashlib.sha256()
+        self.header = None
+        self.pending = ""
+        self.records = []
+        self.pending_rows = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        self.feed(self.decoder.decode(raw_data))
+        return raw_data if self.keep_file else None
+
+    def feed(self, text: str):
+        complete, self.pending = split_complete_records(self.pending + text)
+        if not complete:
+            return
+        if self.header is None:
+            self.header, complete = complete.split("\n", 1)
+            self.header += "\n"
+        self.records.append(complete)
+        self.pending_rows += complete.count("\n")
+        if self.pending_rows >= settings.IMPORT_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        '''writes the records collected so far'''
+        if self.records and self.header is not None:
+            frame = parse_records(self.header + "".join(self.records), self.kind)
+            with import_lock():
+                rows, saved_entries = write_frames([frame], self.kind, transaction_scope="chunk")
+            self.rows += rows
+            self.saved_entries += saved_entries
+        self.records = []
+        self.pending_rows = 0
+
+    def file_complete(self, file_size):
+        self.feed(self.decoder.decode(b"", final=True))
+        if self.pending.strip():
+            self.feed("\n")
+        self.flush()
+
+        sha256 = self.sha256.hexdigest()
+        # a repeated upload saves nothing, the manifest keeps the first import
+        if not ImportedFile.objects.filter(sha256=sha256, state="imported").exists():
+            record_import(self.file_name, self.kind, sha256, file_size, self.rows, self.saved_entries)
+        self.imported = True
+        logger.info(f"imported {self.file_name} while uploading")
+        return None
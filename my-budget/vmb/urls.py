@@ -7,15 +7,19 @@ urlpatterns = [
     path("", views.timecard_overview, name="overview"),
     path("expenditure_documents", views.expenditure_documents, name="expenditure-documents"),
     path("upload_expenditures", views.upload_expenditures, name="upload-expenditures"),
+    path("stream_upload_expenditures", views.stream_upload_expenditures, name="stream-upload-expenditures"),
     path("delete_expenditure_documents", views.delete_expenditure_documents, name="delete-expenditure-documents"),
     path("read_expenditures", views.read_expenditures, name="read-expenditures"),
 
     path("timecard_documents", views.timecard_documents, name="timecard-documents"),
     path("upload_timecards", views.upload_timecard, name="upload-timecards"),
+    path("stream_upload_timecards", views.stream_upload_timecards, name="stream-upload-timecards"),
     path("delete_timecard_documents", views.delete_timecard_documents, name="delete-timecard-documents"),
     path("read_timecards", views.read_timecards, name="read-timecards"),
+    path("import_job/<int:job_id>", views.import_job, name="import-job"),
+    path("import_job_status/<int:job_id>", views.import_job_status, name="import-job-status"),
     path("timecard_report/<int:project_id>", views.report_timecards, name="report-timecards"),
-    path("timecard_report/<int:project_id>/<int:month>", views.report_timecards_customer, name="report-timecards-month"),
+    path("timecard_report/<int:project_id>/<str:month>", views.report_timecards_customer, name="report-timecards-month"),
     path("timecard_overview", views.timecard_overview, name="timecard-overview"),
     path("timecard_detail_by_project/<int:project_id>/", views.timecard_detail_by_project, name="timecard-detail-by-project"),
     path("timecard_detail_by_project_month/<int:project_id>/<str:month>/", views.timecard_detail_by_project_month, name="timecard-detail-by-project-month"),
@@ -32,6 +36,11 @@ urlpatterns = [
 
     path("project_group_create", views.Project_GroupCreateView.as_view(), name="project_group_create"),
     path("project_group_detail/<int:project_group_id>", views.project_group_detail, name="project_group_detail"),
+    path("chart/project/<int:project_id>/<str:kind>.<str:format>", views.project_chart_image, name="project-chart"),
+    path("chart/project_group/<int:project_group_id>.<str:format>", views.project_group_chart_image, name="project-group-chart"),
+    path("chart_series/project/<int:project_id>/<str:kind>", views.project_chart_series, name="project-chart-series"),
+    path("chart_series/project_group/<int:project_group_id>", views.project_group_chart_series, name="project-group-chart-series"),
+    path("project_group_purge/<int:project_group_id>", views.purge_project_group, name="project_group_purge"),
     path("report_timecards_by_group/<int:project_group_id>", views.report_timecards_by_group, name="report_timecards_by_group"),
     path("report_timecards_by_group_by_month/<int:project_group_id>/<str:month>/", views.report_timecards_by_group_by_month, name="report_timecards_by_group_by_month"),
 ]
\ No newline at end of file
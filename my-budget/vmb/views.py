@@ -1,24 +1,48 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from django.conf import settings
 from django.contrib import messages
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import BadRequest
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
 from django.db.models import Sum, Q
-from django.db.models.functions import TruncMonth
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template import loader
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.utils.text import compress_string
+from django.middleware.csrf import (
+    REASON_CSRF_TOKEN_MISSING,
+    REASON_NO_CSRF_COOKIE,
+    CsrfViewMiddleware,
+    InvalidTokenFormat,
+    RejectRequest,
+    _check_token_format,
+    _does_token_match,
+)
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.views.generic.edit import CreateView, UpdateView
 
 from logging import getLogger
 
-import math
+import json
 import os
-import pandas as pd
 import statistics
 
-from .helper import burndown, burndown_by_timecards, hours_by_month_by_project_group, calculate_hours_by_month, calculate_hours_sum, calculate_hours_by_team_and_milestone, calculate_hours_and_delta_by_milestone, calculate_hours_by_milestone
-from .models import ExpenditureItem, Project, Project_Group, ExpenditureDocument, Milestone, TimecardItems, TimecardDocument, TASK_TYPES
+from .analytics import GroupAnalytics, ProjectAnalytics
+from .chartcache import group_data_version
+from .charts import FORMATS
+from .jobs import create_import_job
+from .locks import ImportRunning, import_lock, is_import_running
+from .purge import purge_projects
+from .rollups import add_timecards, bump_data_version, timecards_frame
+from .tools import PERIODS, date_range, period_window
+from .uploadhandlers import StreamingImportUploadHandler
+from .helper import PROJECT_SERIES, TIMEFRAMES, burndown_series, group_hours_series, project_chart, project_group_chart, calculate_hours_by_month, calculate_hours_by_team_and_milestone, expenditure_milestone_rollup, project_overview
+from .models import PROJECT_TYPES, Project, Project_Group, ExpenditureDocument, ImportJob, Milestone, TimecardItems, TimecardDocument
 from .forms import ExpenditureDocumentForm, ProjectForm, MilestoneForm, TimecardDocumentForm
 
 
@@ -46,88 +70,20 @@ def read_expenditures(request):
 
     filenames = next(os.walk(settings.EXPENDITURE_ROOT), (None, None, []))[2]  # [] if no file
 
-    date_format = "%d-%b-%Y"
-
-    saved_entries = 0
-
     logger.debug("found %i files for import", len(filenames))
 
-    for filename in filenames:
-        abs_file_path = os.path.join(settings.EXPENDITURE_ROOT, filename)
-
-        data = pd.read_csv(abs_file_path, sep="\t", encoding="UTF-16")
-
-        for index, row in data.iterrows():
-            trans_id = row.get("Trans Id")
-            items = ExpenditureItem.objects.filter(trans_id=trans_id)
-            if items.exists():
-                logger.debug("Trans Id %i already existing, skipping", trans_id)
-                continue
-
-            project_id = row.get("Project")
-
-            try:
-                project = Project.objects.get(oracle_id=project_id)
-            except ObjectDoesNotExist:
-                project = Project.objects.create(
-                    oracle_id=project_id,
-                    name=project_id,
-                    sold_hours=1,
-                    start_date="1976-01-01",
-                    end_date=datetime.now(),
-                )
-                logger.info("Created Project for Oracle ID %s", project_id)
-
-            item = ExpenditureItem()
-
-            item.trans_id = trans_id
-            item.project = project
-
-            item.task = row.get("Task")
-            item.expnd_type = row.get("Project")
-
-            date_obj = datetime.strptime(row.get("Item Date"), date_format)
-
-            item.item_date = date_obj
-            item.employee_supplier = row.get("Employee/Supplier")
-            item.quantity = row.get("Quantity")
-            item.uom = row.get("UOM")
-
-            pfbc = row.get("Proj Func Burdened Cost")
-            if math.isnan(pfbc):
-                pfbc = 0.0
-            item.proj_func_burdened_cost = pfbc
-
-            pbc = row.get("Project Burdened Cost")
-            if math.isnan(pbc):
-                pbc = 0.0
-            item.project_burdened_cost = pbc
-
-            ar = row.get("Accrued Revenue")
-            if math.isnan(ar):
-                ar = 0.0
-            item.accrued_revenue = ar
-
-            ba = row.get("Bill Amount")
-            if math.isnan(ba):
-                ba = 0.0
-            item.bill_amount = ba
-
-            item.comment = row.get("Comment")
-
-            item.save()
-            saved_entries += 1
-
-    messages.info(
-        request,
-        "Found "
-        + str(len(filenames))
-        + " file(s) for import and imported "
-        + str(saved_entries)
-        + " entries.",
+    if is_import_running():
+        messages.warning(request, str(ImportRunning()))
+        return redirect("overview")
+
+    job = create_import_job(
+        "expenditures",
+        [os.path.join(settings.EXPENDITURE_ROOT, filename) for filename in filenames],
     )
 
-    return redirect("overview")
+    messages.info(request, "Found " + str(len(filenames)) + " file(s) for import.")
+
+    return redirect("import-job", job_id=job.id)
 
 
 def delete_expenditure_documents(request):
@@ -168,6 +124,38 @@ def upload_timecard(request):
     return render(request, "vmb/timecard_upload.html", {"form": form})
 
 
+def period_from_request(request, month: str):
+    """
+    returns the month of the url (e.g. 01Sep2024) and the window of the
+    period requested by the parameters period, start and end
+    """
+    try:
+        target_month = datetime.strptime(month, "%d%b%Y")
+        start = request.GET.get("start")
+        end = request.GET.get("end")
+        window = period_window(
+            target_month.date(),
+            request.GET.get("period", "month"),
+            date.fromisoformat(start) if start else None,
+            date.fromisoformat(end) if end else None,
+            settings.FISCAL_MONTH_START_DAY,
+        )
+    except ValueError as e:
+        raise BadRequest(str(e))
+    return target_month, window
+
+
+def window_context(request, window) -> dict:
+    '''the window and its parameters for the period links of the month pages'''
+    start, end = window
+    return {
+        "period": request.GET.get("period", "month"),
+        "start": start,
+        "last": end - timedelta(days=1),
+        "periods": PERIODS,
+    }
+
+
 def report_timecards(request, project_id):
 
     if request.method == "GET":
@@ -264,17 +252,10 @@ def report_timecards_by_group_by_month(request, project_group_id, month):
 
     project_list = project_group.get_projects()
 
-    target_month = datetime.strptime(month, "%d%b%Y")
+    target_month, window = period_from_request(request, month)
 
-    filter_month = target_month.month
-    filter_year = target_month.year
- 
     reported_timecards = TimecardItems.objects.filter(
-        project__in=project_list,
-        start_date__year__gte=filter_year,
-        start_date__month__gte=filter_month,
-        start_date__year__lte=filter_year,
-        start_date__month__lte=filter_month,
+        project__in=project_list, **date_range("start_date", window)
     )
 
     for timecard_entry in reported_timecards:
@@ -310,9 +291,9 @@ def report_timecards_customer(request, project_id, month):
         ("Start Date", "OPA Project Number", "Total Hours", "Milestone", "Resource", "Timecard Notes")
     ]
 
-    reported_timecards = project.timecarditems_set.filter(
-        start_date__month__lte=month,
-        start_date__month__gte=month)
+    target_month, window = period_from_request(request, month)
+
+    reported_timecards = project.timecarditems_set.filter(**date_range("start_date", window))
     
     for timecard_entry in reported_timecards:
 
@@ -337,106 +318,20 @@ def read_timecards(request):
 
     filenames = next(os.walk(settings.TIMECARDS_ROOT), (None, None, []))[2]  # [] if no file
 
-    date_format = "%m/%d/%Y"
-
-    saved_entries = 0
-
     logger.debug("found %i files for import", len(filenames))
 
-    TASK_TYPE_CHOICES = dict([i[::-1] for i in TASK_TYPES])
-
-    for filename in filenames:
-        abs_file_path = os.path.join(settings.TIMECARDS_ROOT, filename)
-
-        data = pd.read_csv(abs_file_path, sep=",", encoding="UTF-8")
-
-        for index, row in data.iterrows():
-            timecard_id = row.get("Timecard Split ID")
-            items = TimecardItems.objects.filter(timecard_id=timecard_id)
-            if items.exists():
-                logger.info("timecard_id %s already existing, skipping", timecard_id)
-                continue
-
-            project_id = row.get("Project: OPA Project Number")
-
-            try:
-                project = Project.objects.get(oracle_id=project_id)
-            except ObjectDoesNotExist:
-                project = Project.objects.create(
-                    oracle_id=project_id,
-                    name=project_id,
-                    sold_hours=1,
-                    start_date="1976-01-01",
-                    end_date=datetime.now(),
-                )
-                logger.info("Created Project for Oracle ID %s", project_id)
-
-            timecard_item = TimecardItems()
-
-            timecard_item.timecard_id = timecard_id
-            timecard_item.project = project
-
-            milestone_task = row.get("Milestone: OPA Task Number")
-            milestone_name = row.get("Milestone: Milestone Name")
-
-            milestone_name_short = TASK_TYPE_CHOICES[milestone_name]
-
-            milestone = Milestone.objects.filter(project=project, task=milestone_task).first()
-            if milestone is None:
-                logger.debug(f"no milestone {milestone_task} for project {project}")
-                milestone = Milestone.objects.create(
-                    project=project,
-                    task=milestone_task,
-                    name=milestone_name_short,
-                    cost_per_hour=0,
-                    sold_hours=0
-                )
-                logger.info(f"Created {milestone}")
-
-            timecard_item.milestone=milestone
-
-            date_obj = datetime.strptime(row.get("Start Date"), date_format)
-
-            timecard_item.start_date = date_obj
-            timecard_item.name = row.get("Resource: Full Name")
-            timecard_item.total_hours = row.get("Total Hours")
-            timecard_item.deliver_location = row.get("Delivery Location")
-
-            timecard_notes_week = row.get("Timecard Notes week")
-            timecard_notes_friday = row.get("Friday Notes")
-
-            try:
-                math.isnan(timecard_notes_week)
-                timecard_item.notes = timecard_notes_friday
-            except TypeError:
-                timecard_item.notes = timecard_notes_week
-
-            try:
-                team = timecard_item.notes[:3]
-            except TypeError:
-                team = "T00"
-
-            if team.startswith("T"):
-                timecard_item.team = team
-            else:
-                timecard_item.team = "T00"
-                #item.team = "N/A"
-                
-            timecard_item.save()
-            saved_entries += 1
-
-        logger.info(f"saved {saved_entries} entries")
-
-    messages.info(
-        request,
-        "Found "
-        + str(len(filenames))
-        + " file(s) for import and imported "
-        + str(saved_entries)
-        + " entries.",
+    if is_import_running():
+        messages.warning(request, str(ImportRunning()))
+        return redirect("timecard-overview")
+
+    job = create_import_job(
+        "timecards",
+        [os.path.join(settings.TIMECARDS_ROOT, filename) for filename in filenames],
     )
 
-    return redirect("timecard-overview")
+    messages.info(request, "Found " + str(len(filenames)) + " file(s) for import.")
+
+    return redirect("import-job", job_id=job.id)
 
 
 def delete_timecard_documents(request):
@@ -459,6 +354,107 @@ def delete_timecard_documents(request):
 
     return redirect("timecard-documents")
 
+@csrf_exempt
+def stream_upload_timecards(request):
+    return stream_upload(request, "timecards")
+
+
+@csrf_exempt
+def stream_upload_expenditures(request):
+    return stream_upload(request, "expenditures")
+
+
+class _HeaderCsrfCheck(CsrfViewMiddleware):
+    """
+    the CSRF check of the middleware, origin and referer included, but the
+    token is only taken from the X-CSRFToken header, so the body of the
+    request is left unread
+    """
+
+    def _check_token(self, request):
+        try:
+            secret = self._get_secret(request)
+        except InvalidTokenFormat as e:
+            raise RejectRequest(f"CSRF cookie {e.reason}.")
+        if secret is None:
+            raise RejectRequest(REASON_NO_CSRF_COOKIE)
+
+        token = request.META.get(settings.CSRF_HEADER_NAME, "")
+        if not token:
+            raise RejectRequest(REASON_CSRF_TOKEN_MISSING)
+        try:
+            _check_token_format(token)
+        except InvalidTokenFormat as e:
+            raise RejectRequest(self._bad_token_message(e.reason, settings.CSRF_HEADER_NAME))
+        if not _does_token_match(token, secret):
+            raise RejectRequest(self._bad_token_message("incorrect", settings.CSRF_HEADER_NAME))
+
+
+def _csrf_rejected(request):
+    '''runs the CSRF check before the body is read, returns the 403 response if it fails'''
+    return _HeaderCsrfCheck(lambda request: None).process_view(request, None, (), {})
+
+
+def stream_upload(request, kind):
+    """
+    imports the file while it is being uploaded, see StreamingImportUploadHandler.
+    The page sends the CSRF token in the X-CSRFToken header, so it is checked
+    before the body is read. Every chunk of the file is committed as soon as
+    it has arrived.
+    """
+    form_class = TimecardDocumentForm if kind == "timecards" else ExpenditureDocumentForm
+    documents = "timecard-documents" if kind == "timecards" else "expenditure-documents"
+
+    if request.method != "POST":
+        return render(
+            request,
+            "vmb/stream_upload.html",
+            {"form": form_class(), "kind": kind, "documents": documents},
+        )
+
+    rejected = _csrf_rejected(request)
+    if rejected is not None:
+        return rejected
+
+    keep_file = request.GET.get("keep", "1" if settings.IMPORT_KEEP_UPLOADS else "0") == "1"
+    handler = StreamingImportUploadHandler(request, kind, keep_file)
+    request.upload_handlers = [handler]
+    if keep_file:
+        request.upload_handlers.append(TemporaryFileUploadHandler(request))
+
+    try:
+        form = form_class(request.POST, request.FILES)
+    except ImportRunning as e:
+        messages.warning(request, str(e))
+        return redirect(documents)
+    except Exception as e:
+        logger.exception("could not import the uploaded file")
+        messages.error(request, f"Could not import the uploaded file: {e}")
+        return redirect(documents)
+
+    if keep_file and form.is_valid():
+        form.save()
+
+    if handler.imported:
+        messages.info(
+            request,
+            "Read " + str(handler.rows) + " rows and imported " + str(handler.saved_entries) + " entries.",
+        )
+    else:
+        messages.warning(request, "No file has been uploaded.")
+    return redirect(documents)
+
+
+def import_job(request, job_id):
+    job = get_object_or_404(ImportJob, pk=job_id)
+    overview = "overview" if job.kind == "expenditures" else "timecard-overview"
+    return render(request, "vmb/import_job.html", {"job": job, "overview": overview})
+
+
+def import_job_status(request, job_id):
+    job = get_object_or_404(ImportJob, pk=job_id)
+    return JsonResponse(job.as_dict())
+
 #
 # Expenditure based reporting
 #
@@ -468,30 +464,13 @@ def expenditure_detail_by_project(request, project_id):
     if request.method == "GET":
         project = get_object_or_404(Project, pk=project_id)
 
-    data = project.expenditureitem_set.filter(uom="Hours")
+    data = project.expenditurerollup_set.all()
 
-    hours_by_month = (
-        data.annotate(month=TruncMonth("item_date"))
-        .values("month")
-        .annotate(sum=Sum("quantity"))
-    )
+    hours_by_month = calculate_hours_by_month(project.monthlyrollup_set.filter(kind="expenditures"))
     hours_sum = data.aggregate(sum=Sum("quantity"))
     sums = hours_by_month.values_list("sum", flat="True")
 
-    tasks_with_hours = data.values("task").distinct()
-    sums_by_task = []
-    for i in tasks_with_hours:
-        task = i["task"]
-        hours_by_task = project.expenditureitem_set.filter(uom="Hours", task=task)
-        sum = hours_by_task.aggregate(sum=Sum("quantity"))
-        milestone = project.milestone_set.filter(task=task).first()
-        delta = float("NaN")
-        if milestone != None:
-            task = milestone.get_name_display()
-            delta = milestone.sold_hours - sum["sum"]
-        sums_by_task.append(
-            {"task": task, "sum": sum, "milestone": milestone, "delta": delta}
-        )
+    sums_by_task = expenditure_milestone_rollup(data)
 
     milestones = project.milestone_set.filter()
     logger.info(milestones)
@@ -501,8 +480,8 @@ def expenditure_detail_by_project(request, project_id):
         "hours_by_month": hours_by_month,
         "hours_sum": hours_sum,
         "project": project,
-        "avg_burned": statistics.fmean(sums),
-        "graphic": burndown(project=project, timeframe="week")["image"],
+        "avg_burned": statistics.fmean(sums) if sums else None,
+        "client_charts": client_charts(request),
         "sums_by_task": sums_by_task,
         "milestones": milestones,
     }
@@ -513,18 +492,9 @@ def expenditure_detail_by_project_month(request, project_id, month):
     if request.method == "GET":
         project = get_object_or_404(Project, pk=project_id)
 
-    target_month = datetime.strptime(month, "%d%b%Y")
+    target_month, window = period_from_request(request, month)
 
-    filter_month = target_month.month
-    filter_year = target_month.year
-
-    data = project.expenditureitem_set.filter(
-        uom="Hours",
-        item_date__year__gte=filter_year,
-        item_date__month__gte=filter_month,
-        item_date__year__lte=filter_year,
-        item_date__month__lte=filter_month,
-    )
+    data = project.expenditureitem_set.filter(uom="Hours", **date_range("item_date", window))
 
     hours_by_employee = (
         data.values("task", "employee_supplier")
@@ -538,37 +508,22 @@ def expenditure_detail_by_project_month(request, project_id, month):
         "hours_by_employee": hours_by_employee,
         "sum_by_month": sum_by_month,
         "project": project,
-        "month": filter_month,
-        "year": filter_year,
+        "month": month,
         "target_month": target_month,
+        "window": window_context(request, window),
     }
     return HttpResponse(template.render(context, request))
 
 
 def expenditure_overview(request):
-    data = ExpenditureItem.objects.filter(uom="Hours")
-
-    hours_by_project = (
-        data.values("project_id")
-        .order_by("project")
-        .annotate(hours_sum=Sum("quantity"))
+    hours_by_project = project_overview(
+        Sum("expenditurerollup__quantity"), request.GET
     )
 
-    today = datetime.now().date()
-    for line in hours_by_project:
-        project = Project.objects.get(oracle_id=line["project_id"])
-        line["project"] = project
-        line["ratio"] = 100 * line["hours_sum"] / project.sold_hours
-        line["hours_left"] = project.sold_hours - line["hours_sum"]
-        days_left = project.end_date - today
-        if days_left.days < 0:
-            line["days_left"] = "-"
-        else:
-            line["days_left"] = days_left.days
-
     template = loader.get_template("vmb/expenditure_overview.html")
     context = {
         "hours_by_project": hours_by_project,
+        **overview_filters(request),
     }
     return HttpResponse(template.render(context, request))
 
@@ -583,29 +538,20 @@ def timecard_detail_by_project(request, project_id):
     if request.method == "GET":
         project = get_object_or_404(Project, pk=project_id)
 
-    timecards = project.timecarditems_set.all()
-
-    hours_by_month = calculate_hours_by_month(timecards)
-    hours_sum = calculate_hours_sum(timecards)
-
-    sums = hours_by_month.values_list("sum", flat="True")
-
-    teams_lines = calculate_hours_by_team_and_milestone(timecards)
-
-    sums_by_milestone = calculate_hours_and_delta_by_milestone(timecards)
+    analytics = ProjectAnalytics(project)
 
     milestones = project.milestone_set.filter()
     
     template = loader.get_template("vmb/timecard_detail_by_project.html")
     context = {
-        "hours_by_month": hours_by_month,
-        "hours_sum": hours_sum,
+        "hours_by_month": analytics.hours_by_month,
+        "hours_sum": analytics.hours_sum,
         "project": project,
-        "avg_burned": statistics.fmean(sums),
-        "graphic": burndown_by_timecards(project=project, timeframe="week")["image"],
-        "sums_by_task": sums_by_milestone,
+        "avg_burned": analytics.avg_burned,
+        "client_charts": client_charts(request),
+        "sums_by_task": analytics.milestone_lines,
         "milestones": milestones,
-        "hours_by_and_milestone": teams_lines
+        "hours_by_and_milestone": analytics.team_lines
     }
     return HttpResponse(template.render(context, request))
 
@@ -618,41 +564,11 @@ def timecard_detail_by_project_month(request, project_id, month):
     if request.method == "GET":
         project = get_object_or_404(Project, pk=project_id)
 
-    target_month = datetime.strptime(month, "%d%b%Y")
-
-    filter_month = target_month.month
-    filter_year = target_month.year
+    target_month, window = period_from_request(request, month)
 
-    timecards = project.timecarditems_set.filter(
-        
-        start_date__year__gte=filter_year,
-        start_date__month__gte=filter_month,
-        start_date__year__lte=filter_year,
-        start_date__month__lte=filter_month,
-    )
+    timecards = project.timecarditems_set.filter(**date_range("start_date", window))
 
-    milestones_with_hours = timecards.values("milestone").distinct()
-    teams_with_hours = timecards.values('team').distinct()
-    teams_lines = []
-
-    for team_with_hours in teams_with_hours:
-        team_name = team_with_hours['team']
-        sums_by_team_and_milestone = []
-        for milestone_with_hours in milestones_with_hours:
-            milestone_id = milestone_with_hours['milestone']
-            milestone = Milestone.objects.get(id=milestone_id)
-            hours_by_milestone_and_team = timecards.filter(
-                team=team_name, milestone=milestone_id)
-            sum = hours_by_milestone_and_team.aggregate(sum=Sum("total_hours"))
-
-            sums_by_team_and_milestone.append(
-                {"milestone":milestone.get_name_display(), "hours":sum}
-            )
-        teams_lines.append(
-            {"team": team_with_hours, "sums":sums_by_team_and_milestone}
-        )
-    
-    teams_lines = sorted(teams_lines, key=lambda item: item['team']['team'] )
+    teams_lines = calculate_hours_by_team_and_milestone(timecards)
 
     hours_by_employee = (
         timecards.values("milestone__task", "name")
@@ -666,9 +582,9 @@ def timecard_detail_by_project_month(request, project_id, month):
         "hours_by_employee": hours_by_employee,
         "sum_by_month": sum_by_month,
         "project": project,
-        "month": filter_month,
-        "year": filter_year,
+        "month": month,
         "target_month": target_month,
+        "window": window_context(request, window),
         "timecards": timecards,
         "hours_by_and_milestone": teams_lines
     }
@@ -676,60 +592,123 @@ def timecard_detail_by_project_month(request, project_id, month):
 
 
 def timecard_overview(request):
-    data = TimecardItems.objects.all()
-
-    hours_by_project = (
-        data.values("project_id")
-        .order_by("project")
-        .annotate(hours_sum=Sum("total_hours"))
-    )
-
-    today = datetime.now().date()
-    for line in hours_by_project:
-        project = Project.objects.get(oracle_id=line["project_id"])
-        line["project"] = project
-        line["ratio"] = 100 * line["hours_sum"] / project.sold_hours
-        line["hours_left"] = project.sold_hours - line["hours_sum"]
-        days_left = project.end_date - today
-        if days_left.days < 0:
-            line["days_left"] = "-"
-        else:
-            line["days_left"] = days_left.days
+    hours_by_project = project_overview(Sum("timecardrollup__total_hours"), request.GET)
 
     project_groups_list = Project_Group.objects.all()
 
     template = loader.get_template("vmb/timecard_overview.html")
     context = {
-        "hours_by_project": hours_by_project, "project_groups_list" : project_groups_list
+        "hours_by_project": hours_by_project, "project_groups_list" : project_groups_list,
+        **overview_filters(request),
     }
     return HttpResponse(template.render(context, request))
 
 
-def project_group_detail(request, project_group_id):
-    if request.method == "GET":
-        project_group = get_object_or_404(Project_Group, pk=project_group_id)
+def overview_filters(request) -> dict:
+    """context for the filter form of the overview pages"""
+    return {
+        "filter": request.GET,
+        "project_groups": Project_Group.objects.order_by("name"),
+        "project_types": PROJECT_TYPES,
+    }
 
-    project_list = project_group.get_projects()
 
-    reported_timecards = TimecardItems.objects.filter(project__in=project_list)
-    hours_by_month = calculate_hours_by_month(reported_timecards)
-    hours_sum = calculate_hours_sum(reported_timecards)
+CHART_CONTENT_TYPES = {**FORMATS, "json": "application/json"}
+
+
+def _chart_response(request, etag: str, format: str, chart):
+    """
+    serves a chart or its series with a strong ETag, answers 304 if the
+    browser has it already and only calls chart for the bytes otherwise.
+    SVGs and series are sent gzipped to browsers accepting it.
+    """
+    gzipped = format in ("svg", "json") and "gzip" in request.headers.get("Accept-Encoding", "")
+    etag = quote_etag(f"{etag}-gzip" if gzipped else etag)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        image = chart()
+        response = HttpResponse(
+            compress_string(image) if gzipped else image, content_type=CHART_CONTENT_TYPES[format]
+        )
+        if gzipped:
+            response.headers["Content-Encoding"] = "gzip"
+    response.headers["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+def _chart_project(request, project_id, kind):
+    if kind not in PROJECT_SERIES:
+        raise Http404(f"no {kind} chart")
+    timeframe = request.GET.get("timeframe", "week")
+    if timeframe not in TIMEFRAMES:
+        raise BadRequest(f"unknown timeframe {timeframe}")
+    return get_object_or_404(Project, pk=project_id), timeframe
+
+
+def _json(series: dict) -> bytes:
+    return json.dumps(series, cls=DjangoJSONEncoder).encode()
+
+
+def project_chart_image(request, project_id, kind, format):
+    if format not in FORMATS:
+        raise Http404(f"no chart as {format}")
+    project, timeframe = _chart_project(request, project_id, kind)
+
+    etag = f"{kind}-{project.oracle_id}-{timeframe}-{project.data_version}-{format}"
+    return _chart_response(request, etag, format, lambda: project_chart(project, kind, timeframe, format))
+
 
-    team_lines = calculate_hours_by_team_and_milestone(reported_timecards)
+def project_chart_series(request, project_id, kind):
+    project, timeframe = _chart_project(request, project_id, kind)
 
-    graphic = hours_by_month_by_project_group(project_group)["image"]
+    etag = f"{kind}-{project.oracle_id}-{timeframe}-{project.data_version}-json"
+    return _chart_response(request, etag, "json", lambda: _json(burndown_series(project, kind, timeframe)))
 
-    milestone_sum = calculate_hours_by_milestone(reported_timecards)
+
+def project_group_chart_image(request, project_group_id, format):
+    if format not in FORMATS:
+        raise Http404(f"no chart as {format}")
+    project_group = get_object_or_404(Project_Group, pk=project_group_id)
+    version = group_data_version(project_group.get_projects())
+
+    etag = f"group-{project_group.id}-{version}-{format}"
+    return _chart_response(request, etag, format, lambda: project_group_chart(project_group, version, format))
+
+
+def project_group_chart_series(request, project_group_id):
+    project_group = get_object_or_404(Project_Group, pk=project_group_id)
+    version = group_data_version(project_group.get_projects())
+
+    etag = f"group-{project_group.id}-{version}-json"
+    return _chart_response(request, etag, "json", lambda: _json(group_hours_series(project_group)))
+
+
+def client_charts(request) -> bool:
+    '''draw the charts in the browser from their series instead of serving images'''
+    return request.GET.get("charts", settings.CHART_RENDERING) == "client"
+
+
+def project_group_detail(request, project_group_id):
+    if request.method == "GET":
+        project_group = get_object_or_404(Project_Group, pk=project_group_id)
+
+    project_list = list(project_group.get_projects())
+
+    analytics = GroupAnalytics(project_group)
+    for project in project_list:
+        project.hours_sum = analytics.hours_by_project.get(project.oracle_id)
 
     template = loader.get_template("vmb/project_group_detail.html")
     context = {
         "project_group": project_group,
         "project_list": project_list,
-        "graphic": graphic,
-        "hours_by_month": hours_by_month,
-        "hours_sum": hours_sum,
-        "hours_by_team_and_milestone": team_lines,
-        "milestone_sum": milestone_sum
+        "client_charts": client_charts(request),
+        "hours_by_month": analytics.hours_by_month,
+        "hours_sum": analytics.hours_sum,
+        "hours_by_team_and_milestone": analytics.team_lines,
+        "milestone_sum": analytics.milestone_sum
     }
     return HttpResponse(template.render(context, request))
 
@@ -743,15 +722,49 @@ class ProjectCreateView(CreateView):
 
 class ProjectUpdateView(UpdateView):
     model = Project
-    fields = ["name", "sold_hours", "start_date", "end_date", "type", "project_group"]
+    fields = ["name", "sold_hours", "start_date", "end_date", "type", "ideal_shape", "project_group"]
     template_name = "vmb/project_update.html"
     success_url = reverse_lazy("overview")
 
+    def form_valid(self, form):
+        # data_version is left to bump_data_version, so an import bumping it meanwhile is not undone
+        self.object = form.save(commit=False)
+        self.object.save(update_fields=self.fields)
+        bump_data_version([self.object.pk])
+        return redirect(self.get_success_url())
+
+
+def _purged_message(removed: dict) -> str:
+    return ", ".join(f"{rows} {name}" for name, rows in removed.items() if rows) or "nothing"
+
 
 def delete_project(request, project_id):
     if request.method == "GET":
         project = get_object_or_404(Project, pk=project_id)
-        project.delete()
+        try:
+            with import_lock():
+                removed = purge_projects([project.oracle_id])
+        except ImportRunning as e:
+            messages.warning(request, str(e))
+            return redirect("timecard-detail-by-project", project_id=project_id)
+        messages.success(request, f"Project {project.oracle_id} has been deleted: {_purged_message(removed)}")
+
+    return redirect("overview")
+
+
+@require_POST
+def purge_project_group(request, project_group_id):
+    project_group = get_object_or_404(Project_Group, pk=project_group_id)
+    if not request.POST.get("confirm"):
+        messages.warning(request, "Confirm the deletion of the projects of the group first.")
+        return redirect("project_group_detail", project_group_id=project_group_id)
+    try:
+        with import_lock():
+            removed = purge_projects(project_group.get_projects().values_list("oracle_id", flat=True))
+    except ImportRunning as e:
+        messages.warning(request, str(e))
+        return redirect("project_group_detail", project_group_id=project_group_id)
+    messages.success(request, f"The projects of {project_group} have been deleted: {_purged_message(removed)}")
 
     return redirect("overview")
 
@@ -772,6 +785,7 @@ class MilestoneCreateView(CreateView):
     def form_valid(self, form):
         form.instance.project = self.project
         messages.success(self.request, "Milestone has been added")
+        bump_data_version([self.project.oracle_id])
         return super(MilestoneCreateView, self).form_valid(form)
     
 
@@ -788,9 +802,27 @@ class MilestoneUpdateView(UpdateView):
     template_name = "vmb/milestone_update.html"
     success_url = reverse_lazy("overview")
 
+    def form_valid(self, form):
+        bump_data_version([self.object.project_id])
+        return super().form_valid(form)
+
 
 class TimecardItemUpdateView(UpdateView):
     model = TimecardItems
     fields = ["name", "project", "milestone", "total_hours", "deliver_location", "team", "notes"]
     template_name = "vmb/timecarditem_update.html"
-    success_url = reverse_lazy("overview")
\ No newline at end of file
+    success_url = reverse_lazy("overview")
+
+    def form_valid(self, form):
+        # moves the hours of the timecard to its new place in the rollups,
+        # under the import lock so an import can not change them meanwhile
+        try:
+            with import_lock(), transaction.atomic():
+                stored = TimecardItems.objects.get(pk=self.object.pk)
+                add_timecards(timecards_frame([stored]), sign=-1)
+                response = super().form_valid(form)
+                add_timecards(timecards_frame([self.object]))
+        except ImportRunning as e:
+            messages.warning(self.request, str(e))
+            return redirect("timecarditem-update", pk=self.object.pk)
+        return response
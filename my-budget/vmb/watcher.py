@@ -0,0 +1,93 @@
+from django.conf import settings
+from logging import getLogger
+
+import os
+import time
+
+from .importer import import_files
+from .locks import ImportRunning, import_lock
+
+
+logger = getLogger(__name__)
+
+WATCHED_FOLDERS = (
+    ("timecards", "TIMECARDS_ROOT"),
+    ("expenditures", "EXPENDITURE_ROOT"),
+)
+
+
+class DirectoryWatcher:
+    """
+    polls the upload folders and imports files once they have stopped
+    changing. Files are claimed through the import manifest, so several
+    watchers and the web workers can run side by side.
+    """
+
+    def __init__(self, settle: float = 30, batch_size: int = 20):
+        self.settle = settle
+        self.batch_size = batch_size
+        # path -> (size, mtime) as seen by the last scan
+        self.seen = {}
+        # path -> (size, mtime) of files handed to the importer already
+        self.handled = {}
+
+    def ready_files(self, root: str, now: float) -> list:
+        '''returns the files of root that have not changed for settle seconds'''
+        filenames = next(os.walk(root), (None, None, []))[2]  # [] if no folder
+
+        ready = []
+        for filename in sorted(filenames):
+            if filename.startswith("."):
+                continue
+            abs_file_path = os.path.join(root, filename)
+            try:
+                stat = os.stat(abs_file_path)
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            previous = self.seen.get(abs_file_path)
+            self.seen[abs_file_path] = signature
+
+            if self.handled.get(abs_file_path) == signature:
+                continue
+            if previous is not None and previous != signature:
+                # still being written
+                continue
+            if now - stat.st_mtime < self.settle:
+                continue
+            ready.append(abs_file_path)
+        return ready
+
+    def scan(self) -> int:
+        '''imports all files that are ready, returns the number of saved entries'''
+        now = time.time()
+        saved_entries = 0
+        for kind, root in WATCHED_FOLDERS:
+            ready = self.ready_files(getattr(settings, root), now)
+            for start in range(0, len(ready), self.batch_size):
+                batch = ready[start:start + self.batch_size]
+                try:
+                    saved_entries += self.import_batch(batch, kind)
+                except ImportRunning:
+                    # the files are picked up again by the next scan
+                    logger.info("an import is running already, waiting for the next scan")
+                    return saved_entries
+        return saved_entries
+
+    def import_batch(self, batch: list, kind: str) -> int:
+        saved_entries = 0
+        with import_lock():
+            for abs_file_path, saved, error in import_files(batch, kind):
+                if error is None:
+                    self.handled[abs_file_path] = self.seen[abs_file_path]
+                    saved_entries += saved
+                    if saved:
+                        logger.info(f"imported {saved} entries from {abs_file_path}")
+                else:
+                    logger.error(f"could not import {abs_file_path}: {error}")
+        return saved_entries
+
+    def run(self, interval: float = 10):
+        while True:
+            self.scan()
+            time.sleep(interval)